@@ -1,3 +1,4 @@
+import numpy as np
 from vectors.Vector3D import Vector3D
 
 class Parallelopiped:
@@ -8,5 +9,27 @@ class Parallelopiped:
         
     def volume(self):
         return abs(self.len.dotproduct(self.wid.crossproduct(self.hei)))
-    
-    
\ No newline at end of file
+
+    def edges(self):
+        # (3, 3) array of the length, width and height vectors, the row
+        # layout volumes() takes.
+        return np.array([[v.x, v.y, v.z] for v in (self.len, self.wid, self.hei)], dtype=np.float64)
+
+def volumes(edges, chunk_size=1 << 18, out=None):
+    # Volumes of N cells from an (N, 3, 3) array of length, width and height
+    # vectors, |len . (wid x hei)| for each. The input is read chunk_size
+    # cells at a time, so memory-mapped arrays larger than RAM work; pass a
+    # memory-mapped out to keep the result on disk as well.
+    edges = np.asarray(edges)
+    if edges.ndim != 3 or edges.shape[1:] != (3, 3):
+        raise ValueError(f"Expected an (N, 3, 3) array of edge vectors, got shape {edges.shape}")
+    if out is None:
+        out = np.empty(len(edges))
+    for start in range(0, len(edges), chunk_size):
+        block = np.asarray(edges[start:start + chunk_size], dtype=np.float64)
+        a, b, c = block[:, 0], block[:, 1], block[:, 2]
+        out[start:start + len(block)] = np.abs(
+            a[:, 0] * (b[:, 1] * c[:, 2] - b[:, 2] * c[:, 1])
+            + a[:, 1] * (b[:, 2] * c[:, 0] - b[:, 0] * c[:, 2])
+            + a[:, 2] * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0]))
+    return out
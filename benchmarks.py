@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+# Reproducible benchmarks for the simulation step, its phases, the GUI draw
+# path, mutual gravity, bulk cell volumes and the vector/kinematics helpers,
+# and a stability check on resting piles. Results are written as JSON so runs
+# of different engine versions can be compared.
+#
+#   python benchmarks.py --output bench.json
+#   python benchmarks.py --sizes 10 100 1000 --only step phases
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+OBSTACLE_COUNT = 200
+SEED = 12345
+
+def _timed(fn, min_time, max_calls):
+    fn()
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or calls >= max_calls:
+            return elapsed / calls, calls
+
+def _peak_allocation(fn):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+        return {'peak_bytes': peak - before, 'retained_bytes': current - before}
+    finally:
+        tracemalloc.stop()
+
+def _measure(fn, args):
+    seconds, calls = _timed(fn, args.min_time, args.max_calls)
+    result = {'seconds_per_call': seconds, 'calls_per_second': 1 / seconds, 'calls': calls}
+    if not args.no_alloc:
+        result.update(_peak_allocation(fn))
+    return result
+
+def build_scene(engine, n, obstacles=False, trail_length=50):
+    # Bodies are spread so density, and so the contact count per body, stays
+    # roughly the same at every size.
+    rng = np.random.default_rng(SEED)
+    side = 2 * np.sqrt(n)
+    if engine.__name__ == 'newton_opt':
+        sim = engine.Simulation(trail_length=trail_length)
+        make = lambda p, v: engine.PhysicsObject(1.0, p, v, color=(0, 0, 255))
+    else:
+        sim = engine.Simulation()
+        make = lambda p, v: engine.PhysicsObject(1.0, p, v, [0, 0], color=(0, 0, 255))
+    positions = rng.uniform([-side / 2, 1], [side / 2, side + 1], (n, 2))
+    velocities = rng.uniform(-5, 5, (n, 2))
+    for p, v in zip(positions, velocities):
+        sim.add_object(make(p, v))
+    if obstacles:
+        centers = rng.uniform([-side / 2, 1], [side / 2, side + 1], (OBSTACLE_COUNT, 2))
+        sizes = rng.uniform(0.5, 3, (OBSTACLE_COUNT, 2))
+        for c, s in zip(centers, sizes):
+            sim.add_obstacle(engine.Obstacle(c, s))
+    return sim
+
+def bench_step(args):
+    import newton
+    import newton_opt
+    results = []
+    for engine in (newton_opt, newton):
+        for n in args.sizes:
+            if engine is newton and n > args.legacy_max:
+                continue
+            for obstacles in (False, True):
+                sim = build_scene(engine, n, obstacles)
+                r = _measure(lambda: sim.update(1 / 240), args)
+                r.update(engine=engine.__name__, n=n, obstacles=obstacles,
+                         steps_per_second=r['calls_per_second'])
+                results.append(r)
+    return results
+
+def bench_phases(args):
+    import newton_opt
+    results = []
+    for n in args.sizes:
+        sim = build_scene(newton_opt, n, obstacles=True)
+        sim.run(5, 1 / 240)
+        pairs = sim.contact_pairs()
+        contacts = sim.obstacle_contacts()
+        phases = {
+            'integrate': lambda: sim.integrate(1 / 240),
+            'record_trails': sim._record_trails,
+            'contact_pairs': sim.contact_pairs,
+            'resolve_collisions': lambda: sim.resolve_collisions(pairs),
+            'obstacle_contacts': sim.obstacle_contacts,
+            'resolve_obstacle_collisions': lambda: sim.resolve_obstacle_collisions(contacts),
+        }
+        for phase, fn in phases.items():
+            r = _measure(fn, args)
+            r.update(engine='newton_opt', n=n, phase=phase,
+                     pairs=len(pairs), obstacle_contacts=len(contacts))
+            results.append(r)
+    return results
+
+def bench_draw(args):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import newton
+    import newton_opt
+    results = []
+    for engine in (newton_opt, newton):
+        vis = engine.Visualizer(800, 600)
+        for n in args.sizes:
+            if n > args.draw_max or (engine is newton and n > args.legacy_max):
+                continue
+            sim = build_scene(engine, n, obstacles=True)
+            vis.sim = sim
+            sim.run(5, 1 / 240)
+            r = _measure(lambda: vis.draw(sim), args)
+            r.update(engine=engine.__name__, n=n, frames_per_second=r['calls_per_second'])
+            results.append(r)
+    return results
+
+def bench_gravity(args):
+    # barnes_hut builds and walks the tree; barnes_hut_refit is a later
+    # evaluation within the same step, which Simulation gets for the second to
+    # fourth RK4 stages. On one core with NumPy alone, 100k bodies at
+    # theta=0.5 measured about 2.4 s and 1.6 s per evaluation, so an RK4
+    # step takes about 7 s and a semi-implicit Euler step about 2 s: 100k
+    # bodies per step is reached, but not at interactive rates.
+    import gravity
+    results = []
+    rng = np.random.default_rng(SEED)
+    for n in args.sizes:
+        positions = rng.normal(0, np.sqrt(n), (n, 2))
+        masses = rng.uniform(0.5, 2, n)
+        reference = gravity.direct_accelerations(positions, masses, softening=0.1) if n <= args.direct_max else None
+        tree = gravity.QuadTree(positions, masses)
+        tree.accelerations(theta=args.theta, softening=0.1)
+
+        def refit():
+            tree.refit(positions)
+            return tree.accelerations(theta=args.theta, softening=0.1)
+
+        modes = {'barnes_hut': lambda: gravity.barnes_hut_accelerations(positions, masses, theta=args.theta, softening=0.1),
+                 'barnes_hut_refit': refit}
+        if reference is not None:
+            modes['direct'] = lambda: gravity.direct_accelerations(positions, masses, softening=0.1)
+        for mode, fn in modes.items():
+            r = _measure(fn, args)
+            r.update(mode=mode, n=n, theta=args.theta if mode != 'direct' else None)
+            if reference is not None and mode != 'direct':
+                error = np.linalg.norm(fn() - reference, axis=1) / np.linalg.norm(reference, axis=1).mean()
+                r.update(median_error=float(np.median(error)), max_error=float(error.max()))
+            results.append(r)
+    return results
+
+def bench_pile(args):
+    # Bodies dropped from rest into a dense pile on the ground. Collisions may
+    # only take kinetic energy away, so any rise across handle_collisions is
+    # reported as a failure.
+    import newton_opt
+    results = []
+    for n in args.sizes:
+        if n > args.pile_max:
+            continue
+        rng = np.random.default_rng(SEED)
+        sim = newton_opt.Simulation()
+        half_width = 20 * n / 300
+        for p in rng.uniform([-half_width, 0], [half_width, 3], (n, 2)):
+            sim.add_object(newton_opt.PhysicsObject(1.0, p, [0, 0], elasticity=0.5))
+        peak_speed, peak_energy, rise = 0.0, 0.0, 0.0
+        start = time.perf_counter()
+        for _ in range(args.pile_steps):
+            sim.time += 1 / 60
+            sim.integrate(1 / 60)
+            before = sim.kinetic_energies().sum()
+            sim.handle_collisions()
+            after = sim.kinetic_energies().sum()
+            rise = max(rise, after - before)
+            peak_energy = max(peak_energy, before)
+            peak_speed = max(peak_speed, np.linalg.norm(sim.velocities, axis=1).max())
+        results.append({'n': n, 'steps': args.pile_steps, 'seconds': time.perf_counter() - start,
+                        'peak_speed': float(peak_speed), 'max_kinetic_rise': float(rise),
+                        'max_height': float(sim.positions[:, 1].max()),
+                        'passed': bool(rise <= 1e-9 * peak_energy)})
+    return results
+
+def bench_volumes(args):
+    # Parallelopiped volumes per object against the batch path, in memory and
+    # from a memory-mapped file.
+    from Parallelopiped import Parallelopiped, volumes
+    from vectors.Vector3D import Vector3D
+    results = []
+    rng = np.random.default_rng(SEED)
+    # Open memory maps can keep the files from being removed on some platforms.
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as directory:
+        for n in args.sizes:
+            edges = rng.normal(size=(n, 3, 3))
+            path = os.path.join(directory, f'edges_{n}.f64')
+            edges.tofile(path)
+            mapped = np.memmap(path, dtype=np.float64, mode='r', shape=(n, 3, 3))
+            cases = {
+                'batch': lambda: volumes(edges),
+                'batch_memmap': lambda: volumes(mapped),
+            }
+            if n <= args.object_max:
+                cells = [Parallelopiped(*(Vector3D(*row) for row in cell)) for cell in edges.tolist()]
+                cases['per_object'] = lambda: [cell.volume() for cell in cells]
+            for path_name, fn in cases.items():
+                r = _measure(fn, args)
+                r.update(path=path_name, n=n, cells_per_second=n * r['calls_per_second'])
+                results.append(r)
+    return results
+
+def bench_helpers(args):
+    cases = {
+        'Vector2D': "Vector2D(1.5, -2.5)",
+        'Vector2D.__add__': "a2 + b2",
+        'Vector2D.dotproduct': "a2.dotproduct(b2)",
+        'Vector3D': "Vector3D(1.5, -2.5, 0.5)",
+        'Vector3D.crossproduct': "a3.crossproduct(b3)",
+        'kinematics.vel_time2D': "kinematics.vel_time2D(1.0, 2.0, 0.0, -9.8, 0.5)",
+        'kinematics.pos_time3D': "kinematics.pos_time3D(0, 0, 0, 1.0, 2.0, 3.0, 0.5, 0, -9.8, 0)",
+        'kinematics.vel_pos2D': "kinematics.vel_pos2D(1.0, 0.0, 1.0, 2.0, -9.8, 0.1)",
+        'kinematics.pos_time3D_array[10k]': "kinematics.pos_time3D_array(0, 0, 0, 1.0, 2.0, 3.0, t10k, 0, -9.8, 0)",
+        'utils.work': "utils.work(a2, b2)",
+        'utils.angle_between': "utils.angle_between(a2, b2)",
+        'Parallelopiped.volume': "cell.volume()",
+    }
+    setup = """
+import numpy as np
+import kinematics, utils
+from Parallelopiped import Parallelopiped
+from vectors.Vector2D import Vector2D
+from vectors.Vector3D import Vector3D
+a2, b2 = Vector2D(1.5, -2.5), Vector2D(0.5, 4.0)
+a3, b3 = Vector3D(1.5, -2.5, 0.5), Vector3D(0.5, 4.0, -1.0)
+cell = Parallelopiped(Vector3D(1, 0, 0), Vector3D(0, 1, 0), Vector3D(0, 0, 1))
+t10k = np.linspace(0, 1, 10000)
+"""
+    results = []
+    for name, expr in cases.items():
+        r = {'helper': name}
+        try:
+            namespace = {}
+            exec(setup, namespace)
+            code = compile(expr, name, 'eval')
+            r.update(_measure(lambda: eval(code, namespace), args))
+        except Exception as e:
+            # Broken helpers are reported rather than aborting the suite.
+            r['error'] = f"{type(e).__name__}: {e}"
+        results.append(r)
+    return results
+
+SUITES = {'step': bench_step, 'phases': bench_phases, 'draw': bench_draw, 'gravity': bench_gravity,
+          'pile': bench_pile, 'volumes': bench_volumes, 'helpers': bench_helpers}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Physics engine benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--only', nargs='+', choices=list(SUITES), default=list(SUITES))
+    parser.add_argument('--legacy-max', type=int, default=1000,
+                        help="largest object count run through newton.py")
+    parser.add_argument('--draw-max', type=int, default=10000)
+    parser.add_argument('--direct-max', type=int, default=10000,
+                        help="largest object count run through the direct gravity sum")
+    parser.add_argument('--theta', type=float, default=0.5, help="Barnes-Hut opening angle")
+    parser.add_argument('--object-max', type=int, default=100000,
+                        help="largest cell count run through Parallelopiped.volume one by one")
+    parser.add_argument('--pile-max', type=int, default=3000,
+                        help="largest object count dropped into a resting pile")
+    parser.add_argument('--pile-steps', type=int, default=600)
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help="seconds to keep repeating each case")
+    parser.add_argument('--max-calls', type=int, default=1000)
+    parser.add_argument('--no-alloc', action='store_true', help="skip allocation tracking")
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'seed': SEED,
+            'sizes': args.sizes,
+        },
+    }
+    for name in args.only:
+        start = time.perf_counter()
+        report[name] = SUITES[name](args)
+        print(f"{name}: {len(report[name])} cases in {time.perf_counter() - start:.1f}s")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    failed = [r for r in report.get('pile', []) if not r['passed']]
+    for r in failed:
+        print(f"pile: kinetic energy rose by {r['max_kinetic_rise']:.3g} across collisions at n={r['n']}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
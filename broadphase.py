@@ -0,0 +1,321 @@
+import numpy as np
+
+CONTACT_DISTANCE = 1.0
+
+# Neighbouring cells visited from each cell. Only half of the 3x3 block is
+# needed because every pair of cells is then seen exactly once.
+_NEIGHBOUR_OFFSETS = [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]
+
+def canonical_pairs(i, j):
+    pairs = np.stack([np.minimum(i, j), np.maximum(i, j)], axis=1)
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    return pairs[order]
+
+def _within(positions, i, j, distance):
+    d = positions[i] - positions[j]
+    return np.einsum('ij,ij->i', d, d) < distance**2
+
+def brute_force_pairs(positions, distance=CONTACT_DISTANCE):
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    i, j = np.triu_indices(len(positions), 1)
+    close = _within(positions, i, j, distance)
+    return canonical_pairs(i[close], j[close])
+
+def grid_pairs(positions, distance=CONTACT_DISTANCE):
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    if len(positions) < 2:
+        return np.empty((0, 2), dtype=np.intp)
+
+    # With cells as wide as the contact distance, touching bodies are always
+    # in the same or an adjacent cell.
+    cells = np.floor(positions / distance).astype(np.int64)
+    cells -= cells.min(axis=0) - 1
+    stride = cells[:, 1].max() + 2
+    keys = cells[:, 0] * stride + cells[:, 1]
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    slots = np.arange(len(keys))
+
+    first, second = [], []
+    for dx, dy in _NEIGHBOUR_OFFSETS:
+        target = sorted_keys + dx * stride + dy
+        if dx == 0 and dy == 0:
+            starts = slots + 1
+        else:
+            starts = np.searchsorted(sorted_keys, target, side='left')
+        ends = np.searchsorted(sorted_keys, target, side='right')
+        counts = np.maximum(ends - starts, 0)
+        total = counts.sum()
+        if total == 0:
+            continue
+        a = np.repeat(slots, counts)
+        b = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        first.append(order[a])
+        second.append(order[b])
+
+    if not first:
+        return np.empty((0, 2), dtype=np.intp)
+    i, j = np.concatenate(first), np.concatenate(second)
+    close = _within(positions, i, j, distance)
+    return canonical_pairs(i[close], j[close])
+
+def _range_pairs(sorted_values, order, lo, hi):
+    # Pairs each query q with every item whose sorted value is in [lo[q], hi[q]].
+    starts = np.searchsorted(sorted_values, lo, side='left')
+    ends = np.searchsorted(sorted_values, hi, side='right')
+    counts = np.maximum(ends - starts, 0)
+    total = counts.sum()
+    q = np.repeat(np.arange(len(lo)), counts)
+    b = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return q, order[b]
+
+def swept_pairs(starts, ends, fast, distance=CONTACT_DISTANCE):
+    # Time of first contact, as a fraction of the step, for bodies moving in
+    # straight lines from starts to ends. Only pairs with at least one body
+    # in fast are tested; the others move less than half the contact distance
+    # and are left to the discrete check. Pairs already touching at the start
+    # are skipped for the same reason.
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+    fast = np.asarray(fast, dtype=np.intp)
+    if len(fast) == 0 or len(starts) < 2:
+        return np.empty((0, 2), dtype=np.intp), np.empty(0)
+    is_fast = np.zeros(len(starts), dtype=bool)
+    is_fast[fast] = True
+    slow = np.flatnonzero(~is_fast)
+
+    # Sweep and prune along x: fast bodies are matched with every body whose
+    # swept x interval can come within the contact distance of theirs.
+    lo = np.minimum(starts[fast, 0], ends[fast, 0]) - distance
+    hi = np.maximum(starts[fast, 0], ends[fast, 0]) + distance
+    first, second = [], []
+    if len(slow):
+        order = np.argsort(starts[slow, 0], kind='stable')
+        q, b = _range_pairs(starts[slow, 0][order], slow[order], lo - distance / 2, hi + distance / 2)
+        first.append(fast[q])
+        second.append(b)
+    order = np.argsort(lo, kind='stable')
+    reach = (hi - lo).max()
+    q, b = _range_pairs(lo[order], fast[order], lo - reach, hi)
+    keep = fast[q] < b
+    first.append(fast[q][keep])
+    second.append(b[keep])
+    i, j = np.concatenate(first), np.concatenate(second)
+
+    s0 = starts[i] - starts[j]
+    ds = (ends[i] - starts[i]) - (ends[j] - starts[j])
+    a = np.einsum('ij,ij->i', ds, ds)
+    b = 2 * np.einsum('ij,ij->i', s0, ds)
+    c = np.einsum('ij,ij->i', s0, s0) - distance**2
+    disc = b**2 - 4 * a * c
+    hit = (c >= 0) & (b < 0) & (disc >= 0) & (a > 0)
+    toi = np.full(len(i), np.inf)
+    toi[hit] = (-b[hit] - np.sqrt(disc[hit])) / (2 * a[hit])
+    hit &= toi <= 1
+    pairs = np.stack([np.minimum(i, j), np.maximum(i, j)], axis=1)[hit]
+    toi = toi[hit]
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    return pairs[order], toi[order]
+
+class UniformGrid:
+    # Bodies hashed into cells one contact distance wide, kept so that other
+    # points can be queried against them. Used for bodies that do not move,
+    # such as sleeping ones, so the hashing is paid once.
+    def __init__(self, positions, distance=CONTACT_DISTANCE):
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.distance = distance
+        if len(self.positions) == 0:
+            return
+        cells = np.floor(self.positions / distance).astype(np.int64)
+        self.origin = cells.min(axis=0)
+        cells -= self.origin
+        self.stride = cells[:, 1].max() + 1
+        keys = cells[:, 0] * self.stride + cells[:, 1]
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+
+    def query(self, points):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(self.positions) == 0 or len(points) == 0:
+            return np.empty((0, 2), dtype=np.intp)
+        cells = np.floor(points / self.distance).astype(np.int64) - self.origin
+        slots = np.arange(len(points))
+        first, second = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                cx, cy = cells[:, 0] + dx, cells[:, 1] + dy
+                target = cx * self.stride + cy
+                starts = np.searchsorted(self.sorted_keys, target, side='left')
+                ends = np.searchsorted(self.sorted_keys, target, side='right')
+                # Rows outside the grid would alias into the next column.
+                counts = np.where((cy >= 0) & (cy < self.stride), ends - starts, 0)
+                total = counts.sum()
+                if total == 0:
+                    continue
+                a = np.repeat(slots, counts)
+                b = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+                first.append(a)
+                second.append(self.order[b])
+        if not first:
+            return np.empty((0, 2), dtype=np.intp)
+        i, j = np.concatenate(first), np.concatenate(second)
+        d = points[i] - self.positions[j]
+        close = np.einsum('ij,ij->i', d, d) < self.distance**2
+        i, j = i[close], j[close]
+        order = np.lexsort((j, i))
+        return np.stack([i[order], j[order]], axis=1)
+
+def contact_islands(n, pairs):
+    # Labels each of n bodies with the smallest index in its connected
+    # component of the contact graph.
+    labels = np.arange(n)
+    pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+    if len(pairs) == 0:
+        return labels
+    i, j = pairs[:, 0], pairs[:, 1]
+    while True:
+        low = np.minimum(labels[i], labels[j])
+        previous = labels.copy()
+        np.minimum.at(labels, i, low)
+        np.minimum.at(labels, j, low)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+def contact_batches(n, pairs):
+    # Splits the rows of pairs into batches in which no body appears twice,
+    # so each batch can be applied with plain fancy indexing. Every round takes
+    # the pairs whose priority is the lowest among all remaining pairs that
+    # share a body with them. Priorities scramble the row order, as a fixed
+    # odd multiplier is a bijection modulo 2**32, so chains of pairs sorted by
+    # index still split into a few batches rather than one per link.
+    pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+    remaining = np.arange(len(pairs))
+    i, j = pairs[:, 0], pairs[:, 1]
+    priority = (remaining * 2654435761 % 2**32).astype(np.uint32)
+    lowest = np.full(n, 2**32 - 1, dtype=np.uint32)
+    batches = []
+    while len(remaining):
+        np.minimum.at(lowest, i, priority)
+        np.minimum.at(lowest, j, priority)
+        chosen = (lowest[i] == priority) & (lowest[j] == priority)
+        batches.append(remaining[chosen])
+        lowest[i] = lowest[j] = 2**32 - 1
+        rest = ~chosen
+        remaining, i, j, priority = remaining[rest], i[rest], j[rest], priority[rest]
+    return batches
+
+class ObstacleTree:
+    # Static bounding-volume hierarchy over the obstacle boxes, each grown by
+    # half the contact distance so a body touches an obstacle exactly when its
+    # centre is inside the grown box. Rebuild it whenever the obstacles change.
+    def __init__(self, centers, sizes, margin=CONTACT_DISTANCE / 2):
+        self.centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+        self.half_extents = (np.asarray(sizes, dtype=float).reshape(-1, 2) + 2 * margin) / 2
+        self._lower, self._upper, self._left, self._right, self._leaf = [], [], [], [], []
+        if len(self.centers):
+            self._build(np.arange(len(self.centers)),
+                        self.centers - self.half_extents,
+                        self.centers + self.half_extents)
+        self.lower = np.array(self._lower).reshape(-1, 2)
+        self.upper = np.array(self._upper).reshape(-1, 2)
+        self.left = np.array(self._left, dtype=np.intp)
+        self.right = np.array(self._right, dtype=np.intp)
+        self.leaf = np.array(self._leaf, dtype=np.intp)
+
+    def _build(self, items, lo, hi):
+        node = len(self._leaf)
+        lower, upper = lo[items].min(axis=0), hi[items].max(axis=0)
+        self._lower.append(lower)
+        self._upper.append(upper)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._leaf.append(-1)
+        if len(items) == 1:
+            self._leaf[node] = items[0]
+            return node
+        axis = np.argmax(upper - lower)
+        items = items[np.argsort(lo[items, axis] + hi[items, axis], kind='stable')]
+        half = len(items) // 2
+        self._left[node] = self._build(items[:half], lo, hi)
+        self._right[node] = self._build(items[half:], lo, hi)
+        return node
+
+    def query(self, points):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(self.leaf) == 0 or len(points) == 0:
+            return np.empty((0, 2), dtype=np.intp)
+
+        # Walk the tree for all points at once, one level per iteration.
+        body = np.arange(len(points))
+        node = np.zeros(len(points), dtype=np.intp)
+        found_body, found_obstacle = [], []
+        while len(body):
+            p = points[body]
+            inside = np.all((p >= self.lower[node]) & (p <= self.upper[node]), axis=1)
+            body, node = body[inside], node[inside]
+            leaf = self.leaf[node]
+            at_leaf = leaf >= 0
+            found_body.append(body[at_leaf])
+            found_obstacle.append(leaf[at_leaf])
+            body, node = body[~at_leaf], node[~at_leaf]
+            body = np.concatenate([body, body])
+            node = np.concatenate([self.left[node], self.right[node]])
+
+        i, k = np.concatenate(found_body), np.concatenate(found_obstacle)
+        hit = np.all(np.abs(points[i] - self.centers[k]) < self.half_extents[k], axis=1)
+        i, k = i[hit], k[hit]
+        order = np.lexsort((k, i))
+        return np.stack([i[order], k[order]], axis=1)
+
+    def sweep(self, starts, ends):
+        # First entry of each segment into a grown obstacle box, for segments
+        # that start outside it. Returns (segment, obstacle) rows, the entry
+        # time as a fraction of the segment, and the unit normal of the face
+        # that was crossed.
+        starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        if len(self.leaf) == 0 or len(starts) == 0:
+            return np.empty((0, 2), dtype=np.intp), np.empty(0), np.empty((0, 2))
+        seg_lo, seg_hi = np.minimum(starts, ends), np.maximum(starts, ends)
+
+        seg = np.arange(len(starts))
+        node = np.zeros(len(starts), dtype=np.intp)
+        found_seg, found_obstacle = [], []
+        while len(seg):
+            overlap = np.all((seg_hi[seg] >= self.lower[node]) & (seg_lo[seg] <= self.upper[node]), axis=1)
+            seg, node = seg[overlap], node[overlap]
+            leaf = self.leaf[node]
+            at_leaf = leaf >= 0
+            found_seg.append(seg[at_leaf])
+            found_obstacle.append(leaf[at_leaf])
+            seg, node = seg[~at_leaf], node[~at_leaf]
+            seg = np.concatenate([seg, seg])
+            node = np.concatenate([self.left[node], self.right[node]])
+        i, k = np.concatenate(found_seg), np.concatenate(found_obstacle)
+
+        # Slab test against the grown box. A zero component of motion gives
+        # infinite slab times, which fall out of the comparisons correctly.
+        p, d = starts[i], ends[i] - starts[i]
+        box_lo = self.centers[k] - self.half_extents[k]
+        box_hi = self.centers[k] + self.half_extents[k]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t1, t2 = (box_lo - p) / d, (box_hi - p) / d
+        t_near, t_far = np.minimum(t1, t2), np.maximum(t1, t2)
+        axis = np.argmax(t_near, axis=1)
+        rows = np.arange(len(i))
+        t_enter, t_exit = t_near[rows, axis], t_far.min(axis=1)
+        hit = (t_enter <= t_exit) & (t_enter > 0) & (t_enter <= 1)
+
+        normal = np.zeros((len(i), 2))
+        normal[rows, axis] = -np.sign(d[rows, axis])
+        order = np.lexsort((t_enter[hit], i[hit]))
+        return (np.stack([i[hit], k[hit]], axis=1)[order], t_enter[hit][order], normal[hit][order])
+
+def brute_force_obstacle_contacts(points, centers, sizes):
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    half_extents = (np.asarray(sizes, dtype=float).reshape(-1, 2) + 1) / 2
+    hit = np.all(np.abs(points[:, None] - centers[None]) < half_extents[None], axis=2)
+    return np.argwhere(hit)
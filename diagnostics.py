@@ -0,0 +1,93 @@
+import numpy as np
+
+# Whole-scene energy and momentum for newton_opt.Simulation, computed as
+# reductions over the simulation's state arrays. The per-object functions can
+# be called at any time; Diagnostics is an observer that appends the totals to
+# a bounded time series every step:
+#
+#   diag = Diagnostics(history=10000)
+#   sim.observers.append(diag)     # on
+#   sim.observers.remove(diag)     # off, no per-step cost left
+#
+# Potential energy is measured from the ground (y = 0). Work is the work done
+# by the field forces in Simulation.acceleration (gravity and drag) since the
+# observer was attached, integrated with the trapezoidal rule, so kinetic -
+# work stays constant apart from collision losses.
+
+FIELDS = ['time', 'kinetic', 'potential', 'momentum_x', 'momentum_y', 'work']
+
+def kinetic_energies(sim):
+    return 0.5 * sim.masses * np.einsum('ij,ij->i', sim.velocities, sim.velocities)
+
+def potential_energies(sim):
+    return sim.masses * sim.gravity * sim.positions[:, 1]
+
+def momenta(sim):
+    return sim.masses[:, None] * sim.velocities
+
+def totals(sim):
+    p = momenta(sim).sum(axis=0)
+    return {'kinetic': kinetic_energies(sim).sum(), 'potential': potential_energies(sim).sum(),
+            'momentum_x': p[0], 'momentum_y': p[1]}
+
+class Diagnostics:
+    def __init__(self, history=1000, every=1):
+        self.history = history
+        self.every = every
+        self._calls = 0
+        # Each row is written twice, history rows apart, so the newest history
+        # rows are always one contiguous slice.
+        self._rows = np.zeros((2 * history, len(FIELDS)))
+        self._head = 0
+        self.count = 0
+        self.work = np.zeros(0)
+        self._previous_positions = None
+        self._previous_forces = None
+
+    def __call__(self, sim):
+        positions = sim.positions
+        forces = sim.masses[:, None] * sim.acceleration(positions, sim.velocities)
+        if self._previous_positions is None or len(self._previous_positions) != len(positions):
+            # Indices change when objects are added or removed, so per-object
+            # work starts over.
+            self.work = np.zeros(len(positions))
+        else:
+            self.work += np.einsum('ij,ij->i', 0.5 * (forces + self._previous_forces),
+                                   positions - self._previous_positions)
+        self._previous_positions = positions.copy()
+        self._previous_forces = forces
+
+        self._calls += 1
+        if (self._calls - 1) % self.every:
+            return
+        p = momenta(sim).sum(axis=0)
+        row = (sim.time, kinetic_energies(sim).sum(), potential_energies(sim).sum(), p[0], p[1], self.work.sum())
+        self._rows[self._head] = row
+        self._rows[self._head + self.history] = row
+        self._head = (self._head + 1) % self.history
+        self.count = min(self.count + 1, self.history)
+
+    def reset(self):
+        self._head = 0
+        self.count = 0
+        self.work = np.zeros(0)
+        self._previous_positions = None
+        self._previous_forces = None
+
+    def series(self):
+        # (count, len(FIELDS)) view of the recorded rows, oldest first.
+        end = self._head + self.history
+        return self._rows[end - self.count:end]
+
+    def __getitem__(self, field):
+        return self.series()[:, FIELDS.index(field)]
+
+    @property
+    def energy(self):
+        return self['kinetic'] + self['potential']
+
+    @property
+    def work_balance(self):
+        # Kinetic energy not accounted for by field work; changes only
+        # through collisions.
+        return self['kinetic'] - self['work']
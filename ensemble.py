@@ -0,0 +1,77 @@
+import copy
+import itertools
+import math
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+import numpy as np
+
+def parameter_grid(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def check_parameter(sim, name):
+    # Parameters are 'elasticity', for every object, or a public, non-method
+    # attribute the simulation already has, so a misspelt name fails instead
+    # of being set and ignored.
+    if name == 'elasticity':
+        return
+    if name.startswith('_') or not hasattr(sim, name) or callable(getattr(sim, name)):
+        raise AttributeError(f"{type(sim).__name__} has no parameter {name!r}")
+
+def apply_parameters(sim, params):
+    for name, value in params.items():
+        check_parameter(sim, name)
+        if name == 'elasticity':
+            sim.elasticities[:] = value
+        else:
+            setattr(sim, name, value)
+
+def final_state(sim):
+    return np.hstack([sim.positions, sim.velocities])
+
+# Per-process state set up once by the pool initializer, so the scene and the
+# result buffer are not sent again with every task.
+_worker = {}
+
+def _init_worker(scene, runs, steps, dt, metric, shm_name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker.update(scene=scene, runs=runs, steps=steps, dt=dt, metric=metric, shm=shm,
+                   results=np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+def _run_chunk(bounds):
+    start, stop = bounds
+    results = _worker['results']
+    for k in range(start, stop):
+        sim = copy.deepcopy(_worker['scene'])
+        apply_parameters(sim, _worker['runs'][k])
+        sim.run(_worker['steps'], _worker['dt'])
+        results[k] = _worker['metric'](sim)
+    return stop - start
+
+def run_ensemble(scene, grid, steps, dt, metric=final_state, processes=None, chunk_size=None):
+    # Runs a copy of scene for every parameter set in grid (a dict of value
+    # lists, expanded with parameter_grid, or a list of dicts) and returns the
+    # parameter sets with an array holding metric(sim) for each finished run.
+    # Workers write their results straight into shared memory; metric must be
+    # a module-level function and return the same shape for every run.
+    runs = parameter_grid(grid) if isinstance(grid, dict) else list(grid)
+    for name in {name for params in runs for name in params}:
+        check_parameter(scene, name)
+    sample = np.asarray(metric(scene))
+    shape = (len(runs),) + sample.shape
+    processes = processes or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, math.ceil(len(runs) / (4 * processes)))
+    chunks = [(start, min(start + chunk_size, len(runs))) for start in range(0, len(runs), chunk_size)]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, math.prod(shape) * sample.dtype.itemsize))
+    try:
+        initargs = (scene, runs, steps, dt, metric, shm.name, shape, sample.dtype)
+        with mp.Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+            for _ in pool.imap_unordered(_run_chunk, chunks):
+                pass
+        results = np.ndarray(shape, dtype=sample.dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return runs, results
@@ -0,0 +1,265 @@
+import numpy as np
+from constants import G
+
+# Mutual gravitation between bodies. Both functions return the (len(targets),
+# 2) acceleration on the target rows from every body in positions, with
+# Plummer softening so close encounters stay finite:
+#
+#   a_i = G * sum_j m_j (x_j - x_i) / (|x_j - x_i|^2 + softening^2)^(3/2)
+#
+# direct_accelerations is the exact O(N^2) sum, kept as the reference for
+# accuracy checks. barnes_hut_accelerations approximates far groups of
+# bodies by their centre of mass using a quadtree, O(N log N); theta is the
+# opening angle, smaller is more accurate and theta=0 gives the direct sum.
+
+DEPTH = 16
+
+def direct_accelerations(positions, masses, targets=None, softening=0.0, G=G):
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    masses = np.asarray(masses, dtype=float)
+    targets = np.arange(len(positions)) if targets is None else np.asarray(targets, dtype=np.intp)
+    result = np.zeros((len(targets), 2))
+    # Targets are taken in blocks so the pairwise arrays stay a few MB.
+    chunk = max(1, 2**18 // max(len(positions), 1))
+    for start in range(0, len(targets), chunk):
+        rows = targets[start:start + chunk]
+        d = positions[None, :, :] - positions[rows, None, :]
+        r2 = np.einsum('ijk,ijk->ij', d, d) + softening**2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(r2 > 0, G * masses / (r2 * np.sqrt(r2)), 0.0)
+        # A body exerts no force on itself.
+        scale[np.arange(len(rows)), rows] = 0.0
+        result[start:start + chunk] = np.einsum('ij,ijk->ik', scale, d)
+    return result
+
+def _spread_bits(v):
+    # Moves bit k of a 16-bit integer to bit 2k.
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+class QuadTree:
+    # Quadtree over point masses, built level by level from the bodies sorted
+    # along a Morton curve, so every node's bodies are one contiguous range of
+    # the sorted order and the children of a node are contiguous nodes.
+    # A node with leaf_size bodies or fewer is not split.
+    def __init__(self, positions, masses, leaf_size=8):
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.masses = np.asarray(masses, dtype=float)
+        n = len(self.positions)
+        self.lower = self.positions.min(axis=0) if n else np.zeros(2)
+        extent = np.ptp(self.positions, axis=0).max() if n else 0.0
+        self.size = max(extent, 1e-12) * (1 + 1e-9)
+        cells = ((self.positions - self.lower) / self.size * 2**DEPTH).astype(np.int64)
+        cells = np.clip(cells, 0, 2**DEPTH - 1)
+        codes = (_spread_bits(cells[:, 0]) << 1) | _spread_bits(cells[:, 1])
+        self.order = np.argsort(codes, kind='stable')
+        self.rank = np.empty(n, dtype=np.intp)
+        self.rank[self.order] = np.arange(n)
+        codes, cells = codes[self.order], cells[self.order]
+        sorted_positions = self.sorted_positions = self.positions[self.order]
+        sorted_masses = self.sorted_masses = self.masses[self.order]
+        weighted = sorted_positions * sorted_masses[:, None]
+
+        starts, ends, mass, com, center, widths = [], [], [], [], [], []
+        links = []
+        # Sorted-body ranges of the nodes being split, and their node ids. The
+        # root is the single group that splits the whole range.
+        split_start, split_end = np.zeros(min(n, 1), dtype=np.intp), np.full(min(n, 1), n)
+        split_node = np.full(min(n, 1), -1)
+        count = 0
+        for level in range(DEPTH + 1):
+            if len(split_start) == 0:
+                break
+            prefix = codes >> (2 * (DEPTH - level))
+            boundaries = np.concatenate([[0], np.flatnonzero(np.diff(prefix)) + 1])
+            owner = np.searchsorted(split_start, boundaries, side='right') - 1
+            keep = (owner >= 0) & (boundaries < split_end[np.maximum(owner, 0)])
+            group_start = boundaries[keep]
+            group_end = np.append(boundaries[1:], n)[keep]
+            owner = owner[keep]
+            group_mass = np.add.reduceat(sorted_masses, boundaries)[keep]
+            group_moment = np.add.reduceat(weighted, boundaries)[keep]
+
+            width = self.size / 2**level
+            group_center = self.lower + ((cells[group_start] >> (DEPTH - level)) + 0.5) * width
+            with np.errstate(divide='ignore', invalid='ignore'):
+                group_com = np.where(group_mass[:, None] > 0, group_moment / group_mass[:, None], group_center)
+
+            if level > 0:
+                # Each split node's children are contiguous in this level.
+                parents = np.arange(len(split_node))
+                first = np.searchsorted(owner, parents, side='left')
+                last = np.searchsorted(owner, parents, side='right')
+                links.append((split_node, count + first, last - first))
+            starts.append(group_start)
+            ends.append(group_end)
+            mass.append(group_mass)
+            com.append(group_com)
+            center.append(group_center)
+            widths.append(np.full(len(group_start), width))
+
+            split = (group_end - group_start > leaf_size) & (level < DEPTH)
+            split_start, split_end = group_start[split], group_end[split]
+            split_node = count + np.flatnonzero(split)
+            count += len(group_start)
+
+        join = lambda parts, shape: np.concatenate(parts) if parts else np.empty(shape)
+        self.start = join(starts, 0).astype(np.intp)
+        self.end = join(ends, 0).astype(np.intp)
+        self.mass = join(mass, 0)
+        self.com = join(com, (0, 2))
+        self.center = join(center, (0, 2))
+        self.width = join(widths, 0)
+        self.first_child = np.full(count, -1, dtype=np.intp)
+        self.child_count = np.zeros(count, dtype=np.intp)
+        for nodes, first, number in links:
+            self.first_child[nodes] = first
+            self.child_count[nodes] = number
+
+    def refit(self, positions):
+        # Moves the bodies to new positions, keeping the tree's cells and
+        # their bodies, and recomputes the centres of mass. Meant for the
+        # small moves within one integration step, when walking the tree again
+        # would give nearly the same interactions; a walk planned before the
+        # refit is reused by accelerations() afterwards.
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.sorted_positions = self.positions[self.order]
+        moments = np.zeros((len(self.positions) + 1, 2))
+        np.cumsum(self.sorted_positions * self.sorted_masses[:, None], axis=0, out=moments[1:])
+        moment = moments[self.end] - moments[self.start]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.com = np.where(self.mass[:, None] > 0, moment / self.mass[:, None], self.center)
+
+    def accelerations(self, targets=None, theta=0.5, softening=0.0, G=G, chunk=8192):
+        n = len(self.positions)
+        targets = np.arange(n) if targets is None else np.asarray(targets, dtype=np.intp)
+        result = np.zeros((len(targets), 2))
+        if n == 0 or len(targets) == 0:
+            return result
+        plan = getattr(self, '_plan', None)
+        if plan is None or plan[0] != (theta, chunk) or not np.array_equal(plan[1], targets):
+            plan = self._plan = ((theta, chunk), targets, self._walk(targets, theta, chunk))
+        com_x, com_y = self.com[:, 0].copy(), self.com[:, 1].copy()
+        source_x, source_y = self.sorted_positions[:, 0].copy(), self.sorted_positions[:, 1].copy()
+        eps2 = softening**2
+
+        for rows, first, sizes, leaves, (far_group, far_node), (near_group, near_leaf) in plan[2]:
+            x, y = self.positions[targets[rows], 0], self.positions[targets[rows], 1]
+            center_x, center_y = self.center[leaves, 0], self.center[leaves, 1]
+            m = len(leaves)
+
+            # Far field at each leaf's centre and its gradient.
+            dx = com_x[far_node] - center_x[far_group]
+            dy = com_y[far_node] - center_y[far_group]
+            q = dx * dx + dy * dy + eps2
+            a = G * self.mass[far_node] / (q * np.sqrt(q))
+            b = 3 * a / q
+            fx = np.bincount(far_group, a * dx, m)
+            fy = np.bincount(far_group, a * dy, m)
+            fxx = np.bincount(far_group, b * dx * dx - a, m)
+            fxy = np.bincount(far_group, b * dx * dy, m)
+            fyy = np.bincount(far_group, b * dy * dy - a, m)
+
+            # Near leaves body by body: each (group, leaf) row is expanded to
+            # the group's targets, then to the leaf's bodies.
+            target, source = self._expand(near_group, near_leaf, first, sizes)
+            count = self.end[source] - self.start[source]
+            target = np.repeat(target, count)
+            source = np.repeat(self.start[source] - np.cumsum(count) + count, count) + np.arange(count.sum())
+            # The largest arrays of the evaluation, so they are updated in
+            # place rather than through temporaries.
+            dx = source_x[source]
+            dx -= x[target]
+            dy = source_y[source]
+            dy -= y[target]
+            q = dx * dx
+            q += dy * dy
+            q += eps2
+            # Each target meets itself here; like coincident bodies without
+            # softening, it exerts no force.
+            q[q == 0] = np.inf
+            a = np.sqrt(q)
+            a *= q
+            np.divide(self.sorted_masses[source], a, out=a)
+            a *= G
+            dx *= a
+            dy *= a
+            ax = np.bincount(target, dx, len(rows))
+            ay = np.bincount(target, dy, len(rows))
+
+            # The far field reaches each target through a first-order Taylor
+            # expansion about its leaf's centre.
+            owner = np.repeat(np.arange(m), sizes)
+            ox, oy = x - center_x[owner], y - center_y[owner]
+            result[rows, 0] = ax + fx[owner] + fxx[owner] * ox + fxy[owner] * oy
+            result[rows, 1] = ay + fy[owner] + fxy[owner] * ox + fyy[owner] * oy
+        return result
+
+    def _walk(self, targets, theta, chunk):
+        # Targets are walked through the tree together with the other targets
+        # in their leaf, one level per iteration. A node is taken as a point
+        # mass for the whole leaf when it is seen from the leaf's centre under
+        # an angle below theta ((node width + leaf width) / distance < theta);
+        # a leaf that is too close is summed body by body. Returns, per batch
+        # of about chunk targets, the far (group, node) and near (group, leaf)
+        # interactions, so evaluating them again after refit() skips the walk.
+        leaves = np.flatnonzero(self.child_count == 0)
+        leaves = leaves[np.argsort(self.start[leaves])]
+        leaf_of_rank = np.repeat(leaves, self.end[leaves] - self.start[leaves])
+        com_x, com_y = self.com[:, 0], self.com[:, 1]
+
+        target_leaf = leaf_of_rank[self.rank[targets]]
+        by_leaf = np.argsort(target_leaf, kind='stable')
+        groups, group_start, group_size = np.unique(target_leaf[by_leaf], return_index=True, return_counts=True)
+        bounds = np.searchsorted(np.cumsum(group_size), np.arange(chunk, len(targets), chunk))
+        batches = []
+        for batch in np.split(np.arange(len(groups)), np.unique(bounds)):
+            if len(batch) == 0:
+                continue
+            rows = by_leaf[group_start[batch[0]]:group_start[batch[-1]] + group_size[batch[-1]]]
+            first = group_start[batch] - group_start[batch[0]]
+            leaves = groups[batch]
+            center_x, center_y = self.center[leaves, 0], self.center[leaves, 1]
+            leaf_width, leaf_start = self.width[leaves], self.start[leaves]
+            far, near = ([], []), ([], [])
+
+            group = np.arange(len(batch))
+            node = np.zeros(len(batch), dtype=np.intp)
+            while len(group):
+                dx = com_x[node] - center_x[group]
+                dy = com_y[node] - center_y[group]
+                # Node ranges nest like their cells, so this is true exactly
+                # when the leaf lies inside the node.
+                contains = (self.start[node] <= leaf_start[group]) & (leaf_start[group] < self.end[node])
+                reach = self.width[node] + leaf_width[group]
+                is_far = ~contains & (reach * reach < theta**2 * (dx * dx + dy * dy))
+                far[0].append(group[is_far])
+                far[1].append(node[is_far])
+
+                group, node = group[~is_far], node[~is_far]
+                leaf = self.child_count[node] == 0
+                near[0].append(group[leaf])
+                near[1].append(node[leaf])
+
+                group, node = group[~leaf], node[~leaf]
+                children = self.child_count[node]
+                group = np.repeat(group, children)
+                node = np.repeat(self.first_child[node] - np.cumsum(children) + children, children) + np.arange(children.sum())
+            batches.append((rows, first, group_size[batch], leaves,
+                            tuple(np.concatenate(part) for part in far),
+                            tuple(np.concatenate(part) for part in near)))
+        return batches
+
+    @staticmethod
+    def _expand(group, node, first, size):
+        # (group, node) rows to (target row, node) rows for every target in
+        # the group.
+        counts = size[group]
+        target = np.repeat(first[group] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return target, np.repeat(node, counts)
+
+def barnes_hut_accelerations(positions, masses, targets=None, theta=0.5, softening=0.0, G=G, leaf_size=8):
+    return QuadTree(positions, masses, leaf_size).accelerations(targets, theta, softening, G)
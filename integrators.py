@@ -0,0 +1,61 @@
+import numpy as np
+
+# Each integrator advances positions and velocities in place by dt, given
+# acceleration(positions, velocities) -> (N, 2) array for the whole world.
+
+def semi_implicit_euler(acceleration, positions, velocities, dt):
+    velocities += acceleration(positions, velocities) * dt
+    positions += velocities * dt
+
+def velocity_verlet(acceleration, positions, velocities, dt):
+    a = acceleration(positions, velocities)
+    positions += velocities * dt + 0.5 * a * dt**2
+    # Drag depends on velocity, so the end-of-step acceleration is taken at
+    # the Euler-predicted velocity.
+    a_next = acceleration(positions, velocities + a * dt)
+    velocities += 0.5 * (a + a_next) * dt
+
+def rk4(acceleration, positions, velocities, dt):
+    k1x, k1v = velocities, acceleration(positions, velocities)
+    k2x = velocities + 0.5 * dt * k1v
+    k2v = acceleration(positions + 0.5 * dt * k1x, k2x)
+    k3x = velocities + 0.5 * dt * k2v
+    k3v = acceleration(positions + 0.5 * dt * k2x, k3x)
+    k4x = velocities + dt * k3v
+    k4v = acceleration(positions + dt * k3x, k4x)
+    positions += dt / 6 * (k1x + 2 * k2x + 2 * k3x + k4x)
+    velocities += dt / 6 * (k1v + 2 * k2v + 2 * k3v + k4v)
+
+INTEGRATORS = {
+    'semi_implicit_euler': (semi_implicit_euler, 1),
+    'velocity_verlet': (velocity_verlet, 2),
+    'rk4': (rk4, 4),
+}
+
+def adaptive_integrate(name, acceleration, positions, velocities, dt, tolerance, h, min_h=1e-6):
+    # Covers dt in substeps whose size is set by step doubling: each substep
+    # is taken once at h and twice at h/2, and the difference estimates the
+    # local error. Returns the substep size to start from next time.
+    step, order = INTEGRATORS[name]
+    if len(positions) == 0:
+        return h
+    elapsed = 0.0
+    while dt - elapsed > 1e-12 * dt:
+        substep = min(h, dt - elapsed)
+        full_x, full_v = positions.copy(), velocities.copy()
+        step(acceleration, full_x, full_v, substep)
+        half_x, half_v = positions.copy(), velocities.copy()
+        step(acceleration, half_x, half_v, substep / 2)
+        step(acceleration, half_x, half_v, substep / 2)
+
+        error = max(np.abs(half_x - full_x).max(), np.abs(half_v - full_v).max()) / (2**order - 1)
+        accepted = error <= tolerance or substep <= min_h
+        if accepted:
+            positions[:] = half_x
+            velocities[:] = half_v
+            elapsed += substep
+        # A short final substep that fits says nothing about the step size.
+        if not accepted or substep == h:
+            factor = 5.0 if error == 0 else min(5.0, max(0.2, 0.9 * (tolerance / error) ** (1 / (order + 1))))
+            h = max(min_h, substep * factor)
+    return h
@@ -1,6 +1,51 @@
 from vectors.Vector2D import Vector2D
 from vectors.Vector3D import Vector3D
-import cmath as c
+import cmath
+import math
+import numpy as np
+
+# Constant-acceleration kinematics. The scalar functions return one vector;
+# the *_array versions take any mix of scalars and NumPy arrays, broadcast
+# them together and return an array of shape broadcast + (2,) or (3,), which
+# Vector2DArray / Vector3DArray wrap without copying.
+#
+# vel_pos* take the positive root of vo^2 + 2ad. Where that is negative the
+# displacement is never reached, and negative picks what is returned:
+#   'nan'      nan for that component
+#   'clip'     0, the speed at the turning point
+#   'raise'    ValueError
+#   'complex'  the complex root, as cmath gives
+
+NEGATIVE_POLICIES = ('nan', 'clip', 'raise', 'complex')
+
+def _speed(vo, a, d, negative):
+    square = np.asarray(vo, dtype=np.float64)**2 + 2 * np.asarray(a, dtype=np.float64) * d
+    if negative == 'complex':
+        return np.sqrt(square.astype(np.complex128))
+    if negative not in NEGATIVE_POLICIES:
+        raise ValueError(f"Unknown negative policy {negative!r}, expected one of {NEGATIVE_POLICIES}")
+    below = square < 0
+    if np.any(below):
+        if negative == 'raise':
+            raise ValueError("Displacement is not reachable: vo**2 + 2*a*d < 0")
+        square = np.where(below, np.nan if negative == 'nan' else 0.0, square)
+    return np.sqrt(square)
+
+def _scalar_speed(vo, a, d, negative):
+    # _speed for one component, without the cost of going through NumPy.
+    square = vo**2 + 2 * a * d
+    if negative == 'complex':
+        return cmath.sqrt(square)
+    if negative not in NEGATIVE_POLICIES:
+        raise ValueError(f"Unknown negative policy {negative!r}, expected one of {NEGATIVE_POLICIES}")
+    if square < 0:
+        if negative == 'raise':
+            raise ValueError("Displacement is not reachable: vo**2 + 2*a*d < 0")
+        return math.nan if negative == 'nan' else 0.0
+    return math.sqrt(square)
+
+def _stack(*components):
+    return np.stack(np.broadcast_arrays(*components), axis=-1)
 
 
 def vel_time2D(vox, voy, ax, ay, t):
@@ -10,14 +55,42 @@ def vel_time3D(vox, voy, vz, ax, ay, az, t):
     return Vector3D(vox + ax * t, voy + ay * t, vz + az * t)
 
 def pos_time2D(xo, yo, vox, voy, t, ax, ay):
-    return Vector2D(xo + vox * t + ax * (t**2), yo + voy * t + ay * (t**2))
+    return Vector2D(xo + vox * t + 0.5 * ax * (t**2), yo + voy * t + 0.5 * ay * (t**2))
 
 def pos_time3D(xo, yo, zo, vox, voy, voz, t, ax, ay, az):
-    return Vector3D(xo + vox * t + ax * (t**2), yo + voy * t + ay * (t**2), zo + voz * t + az * (t**2))
+    return Vector3D(xo + vox * t + 0.5 * ax * (t**2), yo + voy * t + 0.5 * ay * (t**2), zo + voz * t + 0.5 * az * (t**2))
+
+def vel_pos2D(vox, ax, dx, voy, ay, dy, negative='nan'):
+    return Vector2D(_scalar_speed(vox, ax, dx, negative), _scalar_speed(voy, ay, dy, negative))
+
+def vel_pos3D(vox, ax, dx, voy, ay, dy, voz, az, dz, negative='nan'):
+    return Vector3D(_scalar_speed(vox, ax, dx, negative), _scalar_speed(voy, ay, dy, negative),
+                    _scalar_speed(voz, az, dz, negative))
+
+
+def vel_time2D_array(vox, voy, ax, ay, t):
+    t = np.asarray(t, dtype=np.float64)
+    return _stack(vox + np.multiply(ax, t), voy + np.multiply(ay, t))
+
+def vel_time3D_array(vox, voy, vz, ax, ay, az, t):
+    t = np.asarray(t, dtype=np.float64)
+    return _stack(vox + np.multiply(ax, t), voy + np.multiply(ay, t), vz + np.multiply(az, t))
+
+def pos_time2D_array(xo, yo, vox, voy, t, ax, ay):
+    t = np.asarray(t, dtype=np.float64)
+    half_t2 = 0.5 * t * t
+    return _stack(xo + np.multiply(vox, t) + np.multiply(ax, half_t2),
+                  yo + np.multiply(voy, t) + np.multiply(ay, half_t2))
 
-def vel_pos2D(vox, ax, dx, voy, ay, dy):
-    return Vector2D(c.sqrt(vox ** 2 + 2*ax*dx), c.sqrt(voy ** 2 + 2*ay*dy))
+def pos_time3D_array(xo, yo, zo, vox, voy, voz, t, ax, ay, az):
+    t = np.asarray(t, dtype=np.float64)
+    half_t2 = 0.5 * t * t
+    return _stack(xo + np.multiply(vox, t) + np.multiply(ax, half_t2),
+                  yo + np.multiply(voy, t) + np.multiply(ay, half_t2),
+                  zo + np.multiply(voz, t) + np.multiply(az, half_t2))
 
-def vel_pos3D(vox, ax, dx, voy, ay, dy, voz, az, dz):
-    return Vector3D(c.sqrt(vox ** 2 + 2*ax*dx), c.sqrt(voy ** 2 + 2*ay*dy), c.sqrt(voz ** 2 + 2*az*dz))
+def vel_pos2D_array(vox, ax, dx, voy, ay, dy, negative='nan'):
+    return _stack(_speed(vox, ax, dx, negative), _speed(voy, ay, dy, negative))
 
+def vel_pos3D_array(vox, ax, dx, voy, ay, dy, voz, az, dz, negative='nan'):
+    return _stack(_speed(vox, ax, dx, negative), _speed(voy, ay, dy, negative), _speed(voz, az, dz, negative))
@@ -0,0 +1,370 @@
+import pygame
+import pygame_gui
+import numpy as np
+import time
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PatchCollection
+import cProfile
+import pstats
+from newton import PhysicsObject, Obstacle, Simulation
+
+class Visualizer:
+    def __init__(self, width, height, plot_rate=15):
+        pygame.init()
+        self.width = width
+        self.height = height
+        self.screen = pygame.display.set_mode((width, height))
+        self.clock = pygame.time.Clock()
+        self.fig, self.ax = plt.subplots(figsize=(5, 5))
+        # Side plot redraws per second; None redraws it every frame.
+        self.plot_rate = plot_rate
+        self.setup_plot()
+        self.ui_manager = pygame_gui.UIManager((width, height))
+        self.setup_ui()
+        self.locked_object = None
+        self.object_dialog = None
+        self.obstacle_dialog = None
+        self.selected_object = None
+
+    def setup_ui(self):
+        self.spawn_button = pygame_gui.elements.UIButton(relative_rect=pygame.Rect((10, 10), (100, 50)), text='Spawn Object', manager=self.ui_manager)
+        self.add_obstacle_button = pygame_gui.elements.UIButton(relative_rect=pygame.Rect((120, 10), (100, 50)), text='Add Obstacle', manager=self.ui_manager)
+        self.gravity_slider = pygame_gui.elements.UIHorizontalSlider(relative_rect=pygame.Rect((10, 70), (200, 20)), start_value=Simulation.gravity, value_range=(0, 20), manager=self.ui_manager)
+        self.gravity_label = pygame_gui.elements.UILabel(relative_rect=pygame.Rect((220, 70), (100, 20)), text=f'Gravity: {Simulation.gravity:.2f}', manager=self.ui_manager)
+        self.air_resistance_slider = pygame_gui.elements.UIHorizontalSlider(relative_rect=pygame.Rect((10, 100), (200, 20)), start_value=Simulation.air_resistance, value_range=(0, 1), manager=self.ui_manager)
+        self.air_resistance_label = pygame_gui.elements.UILabel(relative_rect=pygame.Rect((220, 100), (150, 20)), text=f'Air Resistance: {Simulation.air_resistance:.2f}', manager=self.ui_manager)
+        self.object_properties = pygame_gui.elements.UITextBox(relative_rect=pygame.Rect((10, 130), (300, 200)), html_text="Select an object to view properties", manager=self.ui_manager)
+
+    def draw(self, sim):
+        self.screen.fill((255, 255, 255))
+        
+        for obj in sim.objects:
+            self.draw_object(obj)
+            self.draw_trail(obj)
+
+        for obstacle in sim.obstacles:
+            pygame.draw.rect(self.screen, (100, 100, 100), 
+                             (obstacle.position[0] - obstacle.size[0]/2, 
+                              self.height - obstacle.position[1] - obstacle.size[1]/2, 
+                              obstacle.size[0], obstacle.size[1]))
+
+        self.update_plot(sim)
+        self.ui_manager.draw_ui(self.screen)
+        pygame.display.flip()
+
+    def draw_object(self, obj):
+        x, y = obj.position
+        screen_x, screen_y = int(x * 50 + self.width/2), int(self.height - y * 50)
+        
+        if obj == self.selected_object:
+            pygame.draw.circle(self.screen, (255, 0, 0), (screen_x, screen_y), 15, 2)
+
+        if obj.shape == 'circle':
+            pygame.draw.circle(self.screen, obj.color, (screen_x, screen_y), 10)
+        elif obj.shape == 'square':
+            pygame.draw.rect(self.screen, obj.color, (screen_x-10, screen_y-10, 20, 20))
+        elif obj.shape == 'triangle':
+            points = [(screen_x, screen_y-10), (screen_x-10, screen_y+10), (screen_x+10, screen_y+10)]
+            pygame.draw.polygon(self.screen, obj.color, points)
+        elif obj.shape == 'arrow':
+            pygame.draw.line(self.screen, obj.color, (screen_x-10, screen_y), (screen_x+10, screen_y), 5)
+            pygame.draw.polygon(self.screen, obj.color, [(screen_x+10, screen_y), (screen_x, screen_y-5), (screen_x, screen_y+5)])
+
+    def draw_trail(self, obj):
+        if len(obj.trail) > 1:
+            points = [(int(x * 50 + self.width/2), int(self.height - y * 50)) for x, y in obj.trail]
+            pygame.draw.lines(self.screen, obj.color, False, points, 2)
+
+    def setup_plot(self):
+        # The plot's artists are created once. Axes, ground line and obstacles
+        # form a cached background; objects and the title are animated and
+        # drawn over it, so a plot update only re-rasterises those.
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax.axhline(y=0, color='k', linestyle='-', linewidth=2)
+        self.obstacle_patches = PatchCollection([], facecolor='gray')
+        self.ax.add_collection(self.obstacle_patches)
+        self.object_scatter = self.ax.scatter([], [], animated=True)
+        self.plot_title = self.ax.set_title('', animated=True)
+        self.plot_background = None
+        self.plot_limits = None
+        self.plot_obstacle_count = None
+        self.plot_surface = None
+        self.last_plot_time = None
+
+    def plot_obstacles(self, sim):
+        self.obstacle_patches.set_paths([
+            plt.Rectangle((obstacle.position[0] - obstacle.size[0]/2, obstacle.position[1] - obstacle.size[1]/2),
+                          obstacle.size[0], obstacle.size[1])
+            for obstacle in sim.obstacles])
+        self.plot_obstacle_count = len(sim.obstacles)
+
+    def update_plot(self, sim):
+        now = time.perf_counter()
+        if self.plot_surface is None or not self.plot_rate or now - self.last_plot_time >= 1 / self.plot_rate:
+            self.render_plot(sim)
+            self.last_plot_time = now
+        self.screen.blit(self.plot_surface, (self.width - self.plot_surface.get_width(), 0))
+
+    def render_plot(self, sim):
+        if self.locked_object:
+            x, y = self.locked_object.position
+            limits = (x - 5, x + 5, y - 5, y + 5)
+        else:
+            limits = (-10, 10, 0, 20)
+
+        # The background only has to be redrawn when what it shows changes.
+        if len(sim.obstacles) != self.plot_obstacle_count:
+            self.plot_obstacles(sim)
+            self.plot_background = None
+        if limits != self.plot_limits:
+            self.ax.set_xlim(limits[0], limits[1])
+            self.ax.set_ylim(limits[2], limits[3])
+            self.plot_limits = limits
+            self.plot_background = None
+        if self.plot_background is None:
+            self.canvas.draw()
+            self.plot_background = self.canvas.copy_from_bbox(self.fig.bbox)
+        else:
+            self.canvas.restore_region(self.plot_background)
+
+        if sim.objects:
+            self.object_scatter.set_offsets([obj.position for obj in sim.objects])
+            self.object_scatter.set_facecolors(np.array([obj.color for obj in sim.objects]) / 255)
+        else:
+            self.object_scatter.set_offsets(np.empty((0, 2)))
+        self.plot_title.set_text(f"Time: {sim.time:.2f}s")
+        self.ax.draw_artist(self.object_scatter)
+        self.ax.draw_artist(self.plot_title)
+
+        raw_data = self.canvas.buffer_rgba()
+        size = self.canvas.get_width_height()
+        self.plot_surface = pygame.image.frombuffer(raw_data, size, "RGBA").copy()
+
+    def handle_events(self, sim):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                self.handle_object_selection(sim, event.pos)
+            
+            if event.type == pygame_gui.UI_BUTTON_PRESSED:
+                if event.ui_element == self.spawn_button:
+                    self.open_object_dialog()
+                elif event.ui_element == self.add_obstacle_button:
+                    self.open_obstacle_dialog()
+            
+            if event.type == pygame_gui.UI_HORIZONTAL_SLIDER_MOVED:
+                if event.ui_element == self.gravity_slider:
+                    Simulation.gravity = event.value
+                    self.gravity_label.set_text(f'Gravity: {Simulation.gravity:.2f}')
+                elif event.ui_element == self.air_resistance_slider:
+                    Simulation.air_resistance = event.value
+                    self.air_resistance_label.set_text(f'Air Resistance: {Simulation.air_resistance:.2f}')
+
+            if self.object_dialog:
+                dialog_action = self.object_dialog.handle_event(event)
+                if dialog_action:
+                    self.spawn_object_from_dialog(sim, dialog_action)
+                    self.object_dialog = None
+
+            if self.obstacle_dialog:
+                dialog_action = self.obstacle_dialog.handle_event(event)
+                if dialog_action:
+                    self.add_obstacle_from_dialog(sim, dialog_action)
+                    self.obstacle_dialog = None
+            
+            self.ui_manager.process_events(event)
+        
+        self.update_object_properties()
+        return True
+
+    def handle_object_selection(self, sim, mouse_pos):
+        # Picks the nearest object within 15 pixels in one vectorised pass.
+        self.selected_object = None
+        if not sim.objects:
+            return
+        positions = np.array([obj.position for obj in sim.objects], dtype=float)
+        screen = np.column_stack([(positions[:, 0] * 50 + self.width/2).astype(int),
+                                  (self.height - positions[:, 1] * 50).astype(int)])
+        offsets = screen - mouse_pos
+        distances = np.einsum('ij,ij->i', offsets, offsets)
+        nearest = np.argmin(distances)
+        if distances[nearest] < 15**2:
+            self.selected_object = sim.objects[nearest]
+
+    def open_object_dialog(self):
+        self.object_dialog = ObjectCustomizationDialog(self.ui_manager, pygame.Rect((300, 50), (400, 300)))
+
+    def open_obstacle_dialog(self):
+        self.obstacle_dialog = ObstacleCustomizationDialog(self.ui_manager, pygame.Rect((300, 50), (400, 200)))
+
+    def spawn_object_from_dialog(self, sim, object_properties):
+        new_object = PhysicsObject(
+            mass=object_properties['mass'],
+            position=[object_properties['x'], object_properties['y']],
+            velocity=[object_properties['vx'], object_properties['vy']],
+            acceleration=[0, 0],
+            shape=object_properties['shape'],
+            elasticity=object_properties['elasticity']
+        )
+        sim.add_object(new_object)
+
+    def add_obstacle_from_dialog(self, sim, obstacle_properties):
+        new_obstacle = Obstacle(
+            position=[obstacle_properties['x'], obstacle_properties['y']],
+            size=[obstacle_properties['width'], obstacle_properties['height']]
+        )
+        sim.add_obstacle(new_obstacle)
+
+    def update_object_properties(self):
+        if self.selected_object:
+            properties = f"""
+            Mass: {self.selected_object.mass:.2f}
+            Position: ({self.selected_object.position[0]:.2f}, {self.selected_object.position[1]:.2f})
+            Velocity: ({self.selected_object.velocity[0]:.2f}, {self.selected_object.velocity[1]:.2f})
+            Acceleration: ({self.selected_object.acceleration[0]:.2f}, {self.selected_object.acceleration[1]:.2f})
+            Kinetic Energy: {self.selected_object.kinetic_energy:.2f}
+            Potential Energy: {self.selected_object.gravitational_potential_energy:.2f}
+            Momentum: ({self.selected_object.momentum[0]:.2f}, {self.selected_object.momentum[1]:.2f})
+            Work Done: {self.selected_object.work_done:.2f}
+            """
+            self.object_properties.html_text = properties
+            self.object_properties.rebuild()
+
+class ObjectCustomizationDialog:
+    def __init__(self, ui_manager, rect):
+        self.window = pygame_gui.elements.UIWindow(rect, ui_manager, "Spawn Object")
+        
+        y_offset = 10
+        self.mass_entry = self.add_number_entry(ui_manager, "Mass:", y_offset, 1.0)
+        y_offset += 30
+        self.x_entry = self.add_number_entry(ui_manager, "X Position:", y_offset, 0.0)
+        y_offset += 30
+        self.y_entry = self.add_number_entry(ui_manager, "Y Position:", y_offset, 10.0)
+        y_offset += 30
+        self.vx_entry = self.add_number_entry(ui_manager, "X Velocity:", y_offset, 0.0)
+        y_offset += 30
+        self.vy_entry = self.add_number_entry(ui_manager, "Y Velocity:", y_offset, 0.0)
+        y_offset += 30
+        self.elasticity_entry = self.add_number_entry(ui_manager, "Elasticity:", y_offset, 0.8)
+        y_offset += 30
+        
+        self.shape_dropdown = pygame_gui.elements.UIDropDownMenu(
+            ["circle", "square", "triangle", "arrow"],
+            "circle",
+            pygame.Rect((10, y_offset), (180, 30)),
+            ui_manager,
+            container=self.window
+        )
+        
+        self.confirm_button = pygame_gui.elements.UIButton(
+            relative_rect=pygame.Rect((10, 250), (100, 30)),
+            text="Confirm",
+            manager=ui_manager,
+            container=self.window
+        )
+
+    def add_number_entry(self, ui_manager, label, y_offset, default_value):
+        pygame_gui.elements.UILabel(
+            pygame.Rect((10, y_offset), (100, 20)),
+            label,
+            ui_manager,
+            container=self.window
+        )
+        return pygame_gui.elements.UITextEntryLine(
+            pygame.Rect((120, y_offset), (100, 20)),
+            ui_manager,
+            container=self.window,
+            initial_text=str(default_value)
+        )
+
+    def handle_event(self, event):
+        if event.type == pygame_gui.UI_BUTTON_PRESSED:
+            if event.ui_element == self.confirm_button:
+                return self.get_object_properties()
+        return None
+
+    def get_object_properties(self):
+        return {
+            'mass': float(self.mass_entry.get_text()),
+            'x': float(self.x_entry.get_text()),
+            'y': float(self.y_entry.get_text()),
+            'vx': float(self.vx_entry.get_text()),
+            'vy': float(self.vy_entry.get_text()),
+            'elasticity': float(self.elasticity_entry.get_text()),
+            'shape': self.shape_dropdown.selected_option
+        }
+
+class ObstacleCustomizationDialog:
+    def __init__(self, ui_manager, rect):
+        self.window = pygame_gui.elements.UIWindow(rect, ui_manager, "Add Obstacle")
+        
+        y_offset = 10
+        self.x_entry = self.add_number_entry(ui_manager, "X Position:", y_offset, 0.0)
+        y_offset += 30
+        self.y_entry = self.add_number_entry(ui_manager, "Y Position:", y_offset, 5.0)
+        y_offset += 30
+        self.width_entry = self.add_number_entry(ui_manager, "Width:", y_offset, 2.0)
+        y_offset += 30
+        self.height_entry = self.add_number_entry(ui_manager, "Height:", y_offset, 1.0)
+        y_offset += 30
+        
+        self.confirm_button = pygame_gui.elements.UIButton(
+            relative_rect=pygame.Rect((10, y_offset), (100, 30)),
+            text="Confirm",
+            manager=ui_manager,
+            container=self.window
+        )
+
+    def add_number_entry(self, ui_manager, label, y_offset, default_value):
+        pygame_gui.elements.UILabel(
+            pygame.Rect((10, y_offset), (100, 20)),
+            label,
+            ui_manager,
+            container=self.window
+        )
+        return pygame_gui.elements.UITextEntryLine(
+            pygame.Rect((120, y_offset), (100, 20)),
+            ui_manager,
+            container=self.window,
+            initial_text=str(default_value)
+        )
+
+    def handle_event(self, event):
+        if event.type == pygame_gui.UI_BUTTON_PRESSED:
+            if event.ui_element == self.confirm_button:
+                return self.get_obstacle_properties()
+        return None
+
+    def get_obstacle_properties(self):
+        return {
+            'x': float(self.x_entry.get_text()),
+            'y': float(self.y_entry.get_text()),
+            'width': float(self.width_entry.get_text()),
+            'height': float(self.height_entry.get_text())
+        }
+
+def main():
+    sim = Simulation()
+    vis = Visualizer(1200, 800)
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    running = True
+    while running:
+        time_delta = vis.clock.tick(60) / 1000.0
+        
+        running = vis.handle_events(sim)
+        
+        sim.update(1/60)  # Update at 60 FPS
+        vis.draw(sim)
+        vis.ui_manager.update(time_delta)
+
+    profiler.disable()
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    stats.print_stats()
+
+    pygame.quit()
@@ -1,32 +1,98 @@
-import pygame
-import pygame_gui
+import itertools
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-import random
-import cProfile
-import time
-import pstats
-from pygame_gui.elements import UIWindow
+from broadphase import (CONTACT_DISTANCE, canonical_pairs, contact_batches, contact_islands, grid_pairs,
+                        swept_pairs, ObstacleTree, UniformGrid)
+from constants import G
+from gravity import QuadTree, direct_accelerations
+from integrators import INTEGRATORS, adaptive_integrate
+
+SNAPSHOT_VERSION = 1
+
+# Source of Simulation.version values, shared so no two simulations ever
+# report the same version.
+_versions = itertools.count(1)
+
+class _StateField:
+    # Reads and writes go to the owning Simulation's arrays once the object
+    # has been added, and to a private copy while it is detached.
+    def __init__(self, array, convert):
+        self.array = array
+        self.convert = convert
+
+    def __set_name__(self, owner, name):
+        self.local = '_' + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if obj.sim is None:
+            return getattr(obj, self.local)
+        return getattr(obj.sim, self.array)[obj.index]
+
+    def __set__(self, obj, value):
+        if obj.sim is None:
+            setattr(obj, self.local, self.convert(value))
+        else:
+            getattr(obj.sim, self.array)[obj.index] = value
+            # An edited object must not be blended from where it was before.
+            obj.sim._previous_positions = None
+
+def _as_vector(value):
+    return np.array(value, dtype=float)
 
 class PhysicsObject:
-    def __init__(self, mass, position, velocity, shape='circle', color=None, elasticity=0.8):
+    mass = _StateField('masses', float)
+    elasticity = _StateField('elasticities', float)
+    position = _StateField('positions', _as_vector)
+    velocity = _StateField('velocities', _as_vector)
+    record_trail = _StateField('trail_flags', bool)
+
+    def __init__(self, mass, position, velocity, shape='circle', color=None, elasticity=0.8, record_trail=True):
+        self.sim = None
+        self.index = None
         self.mass = mass
-        self.position = np.array(position, dtype=float)
-        self.velocity = np.array(velocity, dtype=float)
+        self.position = position
+        self.velocity = velocity
         self.shape = shape
         self.color = color or (np.random.randint(0, 255), np.random.randint(0, 255), np.random.randint(0, 255))
         self.elasticity = elasticity
-        self.trail = []
-        
+        self.record_trail = record_trail
+        self._trail = []
 
-    def update(self, dt, gravity, air_resistance):
-        self.velocity[1] -= gravity * dt
-        self.velocity -= air_resistance * self.velocity * dt
-        self.position += self.velocity * dt
-        self.trail.append(self.position.copy())
-        if len(self.trail) > 50:
-            self.trail.pop(0)
+    @property
+    def trail(self):
+        if self.sim is None:
+            return self._trail
+        return self.sim.trail(self.index)
+
+    @classmethod
+    def _handle(cls, sim, index, shape, color):
+        obj = cls.__new__(cls)
+        obj.sim, obj.index = sim, index
+        obj.shape, obj.color = shape, color
+        obj._trail = []
+        return obj
+
+    def attach(self, sim, index):
+        sim.masses[index] = self._mass
+        sim.elasticities[index] = self._elasticity
+        sim.positions[index] = self._position
+        sim.velocities[index] = self._velocity
+        sim.trail_flags[index] = self._record_trail
+        sim.trail_counts[index] = 0
+        sim.asleep[index] = False
+        sim.sleep_timers[index] = 0
+        sim.islands[index] = -1
+        self.sim, self.index = sim, index
+
+    def detach(self):
+        self._mass = float(self.sim.masses[self.index])
+        self._elasticity = float(self.sim.elasticities[self.index])
+        self._position = self.sim.positions[self.index].copy()
+        self._velocity = self.sim.velocities[self.index].copy()
+        self._record_trail = bool(self.sim.trail_flags[self.index])
+        self._trail = list(self.sim.trail(self.index).copy())
+        self.sim, self.index = None, None
 
     @property
     def kinetic_energy(self):
@@ -45,593 +111,600 @@ class Obstacle:
         return np.all(np.abs(obj.position - self.position) < (self.size + 1) / 2)
 
 class Simulation:
-    def __init__(self):
+    _STATE_BUFFERS = ('_masses', '_elasticities', '_positions', '_velocities',
+                      '_trail_flags', '_trail_counts', '_trails',
+                      '_asleep', '_sleep_timers', '_islands')
+
+    def __init__(self, trail_length=50):
         self.objects = []
+        # Changes whenever objects are added, removed or reordered, so caches
+        # of per-object data can be keyed on it.
+        self.version = next(_versions)
         self.obstacles = []
         self.time = 0
-        self.gravity = 9.8
-        self.air_resistance = 0.1
+        self._gravity = 9.8
+        self._air_resistance = 0.1
         self.paused = False
+        # Callables run with the simulation after every step, e.g. a
+        # recorder.TrajectoryRecorder.
+        self.observers = []
+        # Fixed-step scheduling for advance(): physics always steps by
+        # fixed_dt, and frame time that is not yet simulated is carried over.
+        self.fixed_dt = 1 / 240
+        self.max_substeps = 8
+        self.accumulator = 0.0
+        # Positions before the last step advance() took, and the version they
+        # belong to, for blending with the current ones.
+        self._previous_positions = None
+        self._previous_version = None
+        # Integration scheme, one of integrators.INTEGRATORS. Setting
+        # tolerance turns on error-controlled substepping inside each step.
+        self.integrator = 'semi_implicit_euler'
+        self.tolerance = None
+        self.adaptive_dt = None
+        # Swept collision tests for bodies that move more than half the
+        # contact distance in a step, so larger steps do not tunnel.
+        self.continuous = False
+        # Mutual gravitation between bodies, added to the uniform gravity
+        # field: 'barnes_hut' for the quadtree approximation with the given
+        # opening angle, 'direct' for the exact pairwise sum, None for off.
+        # Set gravity to 0 for free-floating clusters.
+        self.mutual_gravity = None
+        self.gravitational_constant = G
+        self.opening_angle = 0.5
+        self.softening = 0.1
+        # Quadtree shared by every acceleration evaluation within one step,
+        # refitted to each stage's positions instead of rebuilt and walked
+        # again. Only set while integrate() runs.
+        self._gravity_tree = None
+        self._stepping = False
+        # World state, one row per entry of self.objects. The buffers keep
+        # spare capacity so adding objects does not reallocate every time.
+        self._masses = np.empty(0)
+        self._elasticities = np.empty(0)
+        self._positions = np.empty((0, 2))
+        self._velocities = np.empty((0, 2))
+        # Trails are a ring buffer of the last trail_length positions. Every
+        # sample is written twice, trail_length slots apart, so the ordered
+        # history is always one contiguous slice. trail_length=0 turns trail
+        # recording off entirely.
+        self.trail_length = trail_length
+        self._trail_head = 0
+        self._trail_flags = np.empty(0, dtype=bool)
+        self._trail_counts = np.empty(0, dtype=np.intp)
+        self._trails = np.empty((0, 2 * trail_length, 2))
+        # Sleeping: once every body in a contact island has kept its kinetic
+        # energy below sleep_energy for sleep_time seconds, the island is put
+        # to sleep and skipped by integration and the broadphase until
+        # something wakes it. sleep_time=None turns sleeping off.
+        self.sleep_time = None
+        self.sleep_energy = 0.05
+        self._asleep = np.empty(0, dtype=bool)
+        self._sleep_timers = np.empty(0)
+        self._islands = np.empty(0, dtype=np.intp)
+        self._next_island = 0
+        self._sleeping_grid = None
+        self._obstacle_tree = None
 
-    def add_object(self, obj):
-        self.objects.append(obj)
+    @property
+    def gravity(self):
+        return self._gravity
 
-    def add_obstacle(self, obstacle):
-        self.obstacles.append(obstacle)
+    @gravity.setter
+    def gravity(self, value):
+        self._gravity = value
+        self.wake_all()
 
-    def update(self, dt):
-        if self.paused:
-            return
-        self.time += dt
-        for obj in self.objects:
-            obj.update(dt, self.gravity, self.air_resistance)
-        self.handle_collisions()
+    @property
+    def air_resistance(self):
+        return self._air_resistance
 
-    def handle_collisions(self):
-        for i, obj in enumerate(self.objects):
-            if obj.position[1] <= 0:
-                obj.position[1] = 0
-                obj.velocity[1] = -obj.velocity[1] * obj.elasticity
+    @air_resistance.setter
+    def air_resistance(self, value):
+        self._air_resistance = value
+        self.wake_all()
 
-            for other in self.objects[i+1:]:
-                if np.linalg.norm(obj.position - other.position) < 1:
-                    self.resolve_collision(obj, other)
+    @property
+    def masses(self):
+        return self._masses[:len(self.objects)]
 
-            for obstacle in self.obstacles:
-                if obstacle.collides_with(obj):
-                    self.resolve_obstacle_collision(obj, obstacle)
+    @property
+    def elasticities(self):
+        return self._elasticities[:len(self.objects)]
 
-    def resolve_collision(self, obj1, obj2):
-        v1, v2 = obj1.velocity, obj2.velocity
-        m1, m2 = obj1.mass, obj2.mass
-        total_mass = m1 + m2
-        obj1.velocity = v1 - 2*m2/total_mass * np.dot(v1-v2, obj1.position-obj2.position) / np.linalg.norm(obj1.position-obj2.position)**2 * (obj1.position-obj2.position)
-        obj2.velocity = v2 - 2*m1/total_mass * np.dot(v2-v1, obj2.position-obj1.position) / np.linalg.norm(obj2.position-obj1.position)**2 * (obj2.position-obj1.position)
-        
-        obj1.velocity *= obj1.elasticity
-        obj2.velocity *= obj2.elasticity
+    @property
+    def positions(self):
+        return self._positions[:len(self.objects)]
 
-    def resolve_obstacle_collision(self, obj, obstacle):
-        normal = np.sign(obj.position - obstacle.position)
-        obj.velocity = obj.velocity - 2 * np.dot(obj.velocity, normal) * normal
-        obj.velocity *= obj.elasticity
-    
-    def resolve_collision(self, obj1, obj2):
-        v1, v2 = obj1.velocity, obj2.velocity
-        m1, m2 = obj1.mass, obj2.mass
-        total_mass = m1 + m2
-        
-        # Calculate new velocities
-        new_v1 = v1 - 2*m2/total_mass * np.dot(v1-v2, obj1.position-obj2.position) / np.linalg.norm(obj1.position-obj2.position)**2 * (obj1.position-obj2.position)
-        new_v2 = v2 - 2*m1/total_mass * np.dot(v2-v1, obj2.position-obj1.position) / np.linalg.norm(obj2.position-obj1.position)**2 * (obj2.position-obj1.position)
-        
-        # Apply elasticity
-        obj1.velocity = v1 + (new_v1 - v1) * obj1.elasticity
-        obj2.velocity = v2 + (new_v2 - v2) * obj2.elasticity
+    @property
+    def velocities(self):
+        return self._velocities[:len(self.objects)]
 
-    def resolve_obstacle_collision(self, obj, obstacle):
-        normal = np.sign(obj.position - obstacle.position)
-        v_normal = np.dot(obj.velocity, normal) * normal
-        v_tangent = obj.velocity - v_normal
-        
-        # Reflect the normal component and apply elasticity
-        obj.velocity = v_tangent - v_normal * obj.elasticity
-    
-    def resolve_collision(self, obj1, obj2):
-        v1, v2 = obj1.velocity, obj2.velocity
-        m1, m2 = obj1.mass, obj2.mass
-        total_mass = m1 + m2
-        
-        # Calculate new velocities
-        new_v1 = v1 - 2*m2/total_mass * np.dot(v1-v2, obj1.position-obj2.position) / np.linalg.norm(obj1.position-obj2.position)**2 * (obj1.position-obj2.position)
-        new_v2 = v2 - 2*m1/total_mass * np.dot(v2-v1, obj2.position-obj1.position) / np.linalg.norm(obj2.position-obj1.position)**2 * (obj2.position-obj1.position)
-        
-        # Apply elasticity
-        obj1.velocity = v1 + (new_v1 - v1) * obj1.elasticity
-        obj2.velocity = v2 + (new_v2 - v2) * obj2.elasticity
+    @property
+    def trail_flags(self):
+        return self._trail_flags[:len(self.objects)]
 
-    def resolve_obstacle_collision(self, obj, obstacle):
-        normal = np.sign(obj.position - obstacle.position)
-        v_normal = np.dot(obj.velocity, normal) * normal
-        v_tangent = obj.velocity - v_normal
-        
-        # Reflect the normal component and apply elasticity
-        obj.velocity = v_tangent - v_normal * obj.elasticity
+    @property
+    def trail_counts(self):
+        return self._trail_counts[:len(self.objects)]
 
-class Visualizer:
-    def __init__(self, width, height):
-        pygame.init()
-        self.width = width
-        self.height = height
-        self.screen = pygame.display.set_mode((width, height))
-        self.clock = pygame.time.Clock()
-        self.ui_manager = pygame_gui.UIManager((width, height))
-        self.selected_object = None
-        self.font = pygame.font.Font(None, 24)
-        self.tracking_object = None
-        self.sim = None  # We'll set this in the main function
-        self.last_click_time = 0
-        self.double_click_threshold = 0.3  # 300 milliseconds
-        self.zoom_level = 1.0
-        self.x_min, self.x_max = -10, 10
-        self.y_min, self.y_max = 0, 20
-        self.setup_ui()
-
-    def setup_ui(self):
-        self.spawn_button = pygame_gui.elements.UIButton(
-            relative_rect=pygame.Rect((10, 10), (100, 30)),
-            text='Spawn Object',
-            manager=self.ui_manager
-        )
-        self.add_obstacle_button = pygame_gui.elements.UIButton(
-            relative_rect=pygame.Rect((120, 10), (100, 30)),
-            text='Add Obstacle',
-            manager=self.ui_manager
-        )
-        self.pause_button = pygame_gui.elements.UIButton(
-            relative_rect=pygame.Rect((230, 10), (100, 30)),
-            text='Pause',
-            manager=self.ui_manager
-        )
-        self.gravity_slider = pygame_gui.elements.UIHorizontalSlider(
-            relative_rect=pygame.Rect((10, 50), (200, 20)),
-            start_value=9.8,
-            value_range=(0, 20),
-            manager=self.ui_manager
-        )
-        self.air_resistance_slider = pygame_gui.elements.UIHorizontalSlider(
-            relative_rect=pygame.Rect((10, 80), (200, 20)),
-            start_value=0.1,
-            value_range=(0, 1),
-            manager=self.ui_manager
-        )
-        self.zoom_in_button = pygame_gui.elements.UIButton(
-            relative_rect=pygame.Rect((340, 10), (50, 30)),
-            text='+',
-            manager=self.ui_manager
-        )
-        self.zoom_out_button = pygame_gui.elements.UIButton(
-            relative_rect=pygame.Rect((400, 10), (50, 30)),
-            text='-',
-            manager=self.ui_manager
-        )
-
-    def draw(self, sim):
-        self.screen.fill((255, 255, 255))
-        
-        for obj in sim.objects:
-            self.draw_object(obj)
-            self.draw_trail(obj)
+    @property
+    def asleep(self):
+        return self._asleep[:len(self.objects)]
 
-        for obstacle in sim.obstacles:
-            self.draw_obstacle(obstacle)
+    @property
+    def sleep_timers(self):
+        return self._sleep_timers[:len(self.objects)]
 
-        self.draw_info(sim)
-        self.ui_manager.draw_ui(self.screen)
-        pygame.display.flip()
+    @property
+    def islands(self):
+        return self._islands[:len(self.objects)]
+
+    def _state_buffers(self):
+        return [getattr(self, name) for name in self._STATE_BUFFERS]
+
+    def _reserve(self, capacity):
+        n = len(self.objects)
+        for name in self._STATE_BUFFERS:
+            buf = getattr(self, name)
+            new = np.zeros((capacity,) + buf.shape[1:], dtype=buf.dtype)
+            new[:n] = buf[:n]
+            setattr(self, name, new)
+
+    def set_trail_length(self, trail_length):
+        self.trail_length = trail_length
+        self._trail_head = 0
+        self._trail_counts[:] = 0
+        self._trails = np.zeros((len(self._masses), 2 * trail_length, 2))
+
+    def trail_history(self):
+        # Oldest-first view of every trail; row i holds trail_counts[i] valid
+        # samples at its end.
+        end = self._trail_head + self.trail_length
+        return self._trails[:len(self.objects), end - self.trail_length:end]
+
+    def row_of(self, obj):
+        # Row of obj in the state arrays, or None if obj is not in this
+        # simulation. runner.Frame has the same method.
+        return obj.index if obj.sim is self else None
+
+    def trail(self, index):
+        end = self._trail_head + self.trail_length
+        return self._trails[index, end - self._trail_counts[index]:end]
+
+    def _record_trails(self):
+        if self.trail_length == 0:
+            return
+        n, head = len(self.objects), self._trail_head
+        flags, counts = self.trail_flags, self.trail_counts
+        slots = [head, head + self.trail_length]
+        if flags.all():
+            self._trails[:n, slots] = self.positions[:, None]
+        else:
+            self._trails[np.flatnonzero(flags)[:, None], slots] = self.positions[flags][:, None]
+        np.minimum(counts + flags, self.trail_length, out=counts)
+        counts[~flags] = 0
+        self._trail_head = (head + 1) % self.trail_length
 
-        if self.tracking_object:
-            self.center_on_tracked_object()
+    def add_object(self, obj):
+        n = len(self.objects)
+        if n == len(self._masses):
+            self._reserve(max(16, 2 * n))
+        self.objects.append(obj)
+        obj.attach(self, n)
+        self.version = next(_versions)
+
+    def remove_object(self, obj):
+        i, last = obj.index, len(self.objects) - 1
+        obj.detach()
+        if i != last:
+            moved = self.objects[last]
+            for buf in self._state_buffers():
+                buf[i] = buf[last]
+            moved.index = i
+            self.objects[i] = moved
+        self.objects.pop()
+        self._sleeping_grid = None
+        self.version = next(_versions)
+
+    def save(self, path):
+        n = len(self.objects)
+        state = {name.lstrip('_'): getattr(self, name)[:n] for name in self._STATE_BUFFERS}
+        # Only the ordered half of the mirrored trail buffer is stored.
+        state['trails'] = self.trail_history()
+        if self._previous_positions is not None:
+            state['previous_positions'] = self._previous_positions
+        np.savez(path, version=SNAPSHOT_VERSION,
+                 time=self.time, gravity=self.gravity, air_resistance=self.air_resistance,
+                 paused=self.paused, fixed_dt=self.fixed_dt, max_substeps=self.max_substeps,
+                 accumulator=self.accumulator, trail_length=self.trail_length,
+                 integrator=self.integrator, tolerance=np.nan if self.tolerance is None else self.tolerance,
+                 adaptive_dt=np.nan if self.adaptive_dt is None else self.adaptive_dt,
+                 sleep_time=np.nan if self.sleep_time is None else self.sleep_time,
+                 sleep_energy=self.sleep_energy, next_island=self._next_island,
+                 continuous=self.continuous, mutual_gravity=self.mutual_gravity or '',
+                 gravitational_constant=self.gravitational_constant,
+                 opening_angle=self.opening_angle, softening=self.softening,
+                 shapes=np.array([obj.shape for obj in self.objects], dtype=str),
+                 colors=np.array([obj.color for obj in self.objects], dtype=np.uint8).reshape(n, 3),
+                 obstacle_positions=np.array([o.position for o in self.obstacles], dtype=float).reshape(-1, 2),
+                 obstacle_sizes=np.array([o.size for o in self.obstacles], dtype=float).reshape(-1, 2),
+                 **state)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version {int(data['version'])}")
+            sim = cls(trail_length=int(data['trail_length']))
+            sim.time = float(data['time'])
+            sim.gravity = float(data['gravity'])
+            sim.air_resistance = float(data['air_resistance'])
+            sim.paused = bool(data['paused'])
+            sim.fixed_dt = float(data['fixed_dt'])
+            sim.max_substeps = int(data['max_substeps'])
+            sim.accumulator = float(data['accumulator'])
+            if 'integrator' in data.files:
+                sim.integrator = str(data['integrator'])
+                sim.tolerance = None if np.isnan(data['tolerance']) else float(data['tolerance'])
+                sim.adaptive_dt = None if np.isnan(data['adaptive_dt']) else float(data['adaptive_dt'])
+            if 'sleep_time' in data.files:
+                sim.sleep_time = None if np.isnan(data['sleep_time']) else float(data['sleep_time'])
+                sim.sleep_energy = float(data['sleep_energy'])
+                sim._next_island = int(data['next_island'])
+                sim.continuous = bool(data['continuous'])
+            if 'mutual_gravity' in data.files:
+                sim.mutual_gravity = str(data['mutual_gravity']) or None
+                sim.gravitational_constant = float(data['gravitational_constant'])
+                sim.opening_angle = float(data['opening_angle'])
+                sim.softening = float(data['softening'])
+
+            n = len(data['masses'])
+            sim._reserve(max(16, n))
+            for name in cls._STATE_BUFFERS:
+                if name != '_trails' and name.lstrip('_') in data.files:
+                    getattr(sim, name)[:n] = data[name.lstrip('_')]
+            sim._trails[:n, :sim.trail_length] = data['trails']
+            sim._trails[:n, sim.trail_length:] = data['trails']
+            sim.objects = [PhysicsObject._handle(sim, i, str(shape), tuple(color))
+                           for i, (shape, color) in enumerate(zip(data['shapes'], data['colors'].tolist()))]
+            sim.version = next(_versions)
+            if 'previous_positions' in data.files:
+                sim._previous_positions = data['previous_positions']
+                sim._previous_version = sim.version
+            for position, size in zip(data['obstacle_positions'], data['obstacle_sizes']):
+                sim.add_obstacle(Obstacle(position, size))
+        return sim
 
-    def draw_object(self, obj):
-        screen_x, screen_y = self.world_to_screen(obj.position)
-        
-        if obj == self.selected_object:
-            pygame.draw.circle(self.screen, (255, 0, 0), (screen_x, screen_y), int(12 * self.zoom_level), 2)
-
-        if obj == self.tracking_object:
-            pygame.draw.circle(self.screen, (0, 255, 0), (screen_x, screen_y), int(14 * self.zoom_level), 2)
-
-        if obj.shape == 'circle':
-            pygame.draw.circle(self.screen, obj.color, (screen_x, screen_y), int(10 * self.zoom_level))
-        elif obj.shape == 'square':
-            size = int(20 * self.zoom_level)
-            pygame.draw.rect(self.screen, obj.color, (screen_x - size//2, screen_y - size//2, size, size))
-
-    def draw_obstacle(self, obstacle):
-        screen_x, screen_y = self.world_to_screen(obstacle.position)
-        width = int(obstacle.size[0] * 20 * self.zoom_level)
-        height = int(obstacle.size[1] * 20 * self.zoom_level)
-        pygame.draw.rect(self.screen, (100, 100, 100), 
-                         (screen_x - width//2, screen_y - height//2, width, height))
-
-    def draw_trail(self, obj):
-        if len(obj.trail) > 1:
-            points = [self.world_to_screen(pos) for pos in obj.trail]
-            pygame.draw.lines(self.screen, obj.color, False, points, 2)
-
-    def draw_info(self, sim):
-        info_text = f"Time: {sim.time:.2f}s  Gravity: {sim.gravity:.2f}  Air Resistance: {sim.air_resistance:.2f}"
-        info_surface = self.font.render(info_text, True, (0, 0, 0))
-        self.screen.blit(info_surface, (10, self.height - 30))
-
-        if self.selected_object:
-            obj = self.selected_object
-            obj_info = f"Mass: {obj.mass:.2f}  Pos: ({obj.position[0]:.2f}, {obj.position[1]:.2f})  Vel: ({obj.velocity[0]:.2f}, {obj.velocity[1]:.2f})"
-            obj_surface = self.font.render(obj_info, True, (0, 0, 0))
-            self.screen.blit(obj_surface, (10, self.height - 60))
-
-    def handle_events(self, sim):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                return False
-            
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:  # Left click
-                    self.handle_object_selection(sim, event.pos)
-                elif event.button == 3:  # Right click
-                    self.handle_obstacle_selection(sim, event.pos)
-            
-            if event.type == pygame_gui.UI_BUTTON_PRESSED:
-                if event.ui_element == self.spawn_button:
-                    self.spawn_object(sim)
-                elif event.ui_element == self.add_obstacle_button:
-                    self.open_obstacle_editor()
-                elif event.ui_element == self.pause_button:
-                    sim.paused = not sim.paused
-                    self.pause_button.set_text('Resume' if sim.paused else 'Pause')
-                elif event.ui_element == self.zoom_in_button:
-                    self.zoom_level *= 1.1
-                elif event.ui_element == self.zoom_out_button:
-                    self.zoom_level /= 1.1
-
-            if event.type == pygame_gui.UI_HORIZONTAL_SLIDER_MOVED:
-                if event.ui_element == self.gravity_slider:
-                    sim.gravity = event.value
-                elif event.ui_element == self.air_resistance_slider:
-                    sim.air_resistance = event.value
-            
-            self.ui_manager.process_events(event)
-        
-        return True
-
-    def world_to_screen(self, position):
-        x, y = position
-        screen_x = int((x - self.x_min) / (self.x_max - self.x_min) * self.width * self.zoom_level)
-        screen_y = int((self.y_max - y) / (self.y_max - self.y_min) * self.height * self.zoom_level)
-        return screen_x, screen_y
-
-    def spawn_object(self, sim):
-        new_object = PhysicsObject(
-            mass=1.0,
-            position=[np.random.uniform(-5, 5), np.random.uniform(5, 15)],
-            velocity=[np.random.uniform(-5, 5), np.random.uniform(-5, 5)],
-            shape='circle'
-        )
-        sim.add_object(new_object)
-
-    def open_obstacle_editor(self, obstacle=None):
-        editor_dialog = ObstacleEditorDialog(
-            self.ui_manager,
-            pygame.Rect((self.width/2 - 150, self.height/2 - 125), (300, 250)),
-            self,
-            obstacle
-        )
-
-    def handle_object_selection(self, sim, mouse_pos):
-        for obj in sim.objects:
-            screen_x, screen_y = self.world_to_screen(obj.position)
-            if np.linalg.norm(np.array([screen_x, screen_y]) - np.array(mouse_pos)) < 15 * self.zoom_level:
-                self.selected_object = obj
-                print(f"Object selected: {obj}")
-                return
-        self.selected_object = None
-        print("No object selected")
-
-    def handle_object_selection(self, sim, mouse_pos):
-        current_time = time.time()
-    
-        for obj in sim.objects:
-            screen_x, screen_y = self.world_to_screen(obj.position)
-            if np.linalg.norm(np.array([screen_x, screen_y]) - np.array(mouse_pos)) < 15 * self.zoom_level:
-                if obj == self.selected_object:
-                    # Check for double-click
-                    if current_time - self.last_click_time < self.double_click_threshold:
-                        print(f"Double-click detected on object: {obj}")
-                        self.open_object_menu()
-                    else:
-                        print(f"Single click on selected object: {obj}")
-                else:
-                    self.selected_object = obj
-                    print(f"Object selected: {obj}")
-                self.last_click_time = current_time
-                return
-    
-        self.selected_object = None
-        print("No object selected")
-
-    def center_on_tracked_object(self):
-        if self.tracking_object:
-            x, y = self.tracking_object.position
-            center_x = (self.x_min + self.x_max) / 2
-            center_y = (self.y_min + self.y_max) / 2
-            offset_x = x - center_x
-            offset_y = y - center_y
-            
-            self.x_min += offset_x
-            self.x_max += offset_x
-            self.y_min += offset_y
-            self.y_max += offset_y
-
-    def open_object_menu(self):
-        if self.selected_object:
-            print(f"Opening menu for object: {self.selected_object}")
-            menu_dialog = ObjectMenuDialog(
-                self.ui_manager,
-                pygame.Rect((self.width/2 - 200, self.height/2 - 150), (400, 300)),
-                self
-        )
-        else:
-            print("No object selected when trying to open menu")
+    def add_obstacle(self, obstacle):
+        self.obstacles.append(obstacle)
+        self.invalidate_obstacles()
 
-class ObjectMenuDialog(UIWindow):
-    def __init__(self, manager, rect, visualizer):
-        super().__init__(rect, manager, window_display_title="Object Menu")
-        
-        self.visualizer = visualizer
-        self.selected_object = visualizer.selected_object
-        self.ui_manager = manager
-
-        # Add custom buttons
-        button_layout_rect = pygame.Rect(0, 0, 180, 30)
-        self.edit_button = pygame_gui.elements.UIButton(
-            relative_rect=button_layout_rect.move(10, 60),
-            text="Edit Properties",
-            container=self,
-            manager=manager
-        )
-        self.delete_button = pygame_gui.elements.UIButton(
-            relative_rect=button_layout_rect.move(10, 100),
-            text="Delete Object",
-            container=self,
-            manager=manager
-        )
-        self.track_button = pygame_gui.elements.UIButton(
-            relative_rect=button_layout_rect.move(10, 140),
-            text="Track Object",
-            container=self,
-            manager=manager
-        )
-
-    def process_event(self, event):
-        handled = super().process_event(event)
-        
-        if event.type == pygame_gui.UI_BUTTON_PRESSED:
-            if event.ui_element == self.edit_button:
-                self.open_edit_properties_dialog()
-            elif event.ui_element == self.delete_button:
-                self.delete_object()
-            elif event.ui_element == self.track_button:
-                self.toggle_tracking()
-            handled = True
-
-        return handled
-
-    def open_edit_properties_dialog(self):
-        if self.selected_object:
-            edit_dialog = EditPropertiesDialog(
-                self.ui_manager,
-                pygame.Rect((self.rect.x + 50, self.rect.y + 50), (300, 250)),
-                self.selected_object,
-                self.visualizer
-        )
-
-    def delete_object(self):
-        if self.selected_object:
-            self.visualizer.sim.objects.remove(self.selected_object)
-            self.visualizer.selected_object = None
-            self.kill()
-
-    def toggle_tracking(self):
-        if self.selected_object:
-            if self.visualizer.tracking_object == self.selected_object:
-                self.visualizer.tracking_object = None
-            else:
-                self.visualizer.tracking_object = self.selected_object
-            self.kill()
+    def invalidate_obstacles(self):
+        self._obstacle_tree = None
+        self.wake_all()
 
-    def process_event(self, event):
-        handled = super().process_event(event)
-        
-        if event.type == pygame_gui.UI_BUTTON_PRESSED:
-            if event.ui_element == self.edit_button:
-                self.open_edit_properties_dialog()
-            elif event.ui_element == self.delete_button:
-                self.delete_object()
-            elif event.ui_element == self.track_button:
-                self.toggle_tracking()
-            handled = True
-
-        return handled
-
-    def open_edit_properties_dialog(self):
-        if self.selected_object:
-            edit_dialog = EditPropertiesDialog(self.ui_manager, pygame.Rect((self.rect.x + 50, self.rect.y + 50), (300, 250)), self.selected_object, self.visualizer)
-            edit_dialog.set_blocking(True)
-
-    def delete_object(self):
-        if self.selected_object:
-            self.visualizer.sim.objects.remove(self.selected_object)
-            self.visualizer.selected_object = None
-            self.kill()
-
-    def toggle_tracking(self):
-        if self.selected_object:
-            if self.visualizer.tracking_object == self.selected_object:
-                self.visualizer.tracking_object = None
-            else:
-                self.visualizer.tracking_object = self.selected_object
-            self.kill()
-
-class ObstacleEditorDialog(UIWindow):
-    def __init__(self, manager, rect, visualizer, obstacle=None):
-        super().__init__(rect, manager, window_display_title="Obstacle Editor")
-        self.visualizer = visualizer
-        self.obstacle = obstacle
-
-        y_offset = 20
-        self.x_entry = self.add_entry(manager, "X Position:", y_offset, str(obstacle.position[0]) if obstacle else "0")
-        y_offset += 30
-        self.y_entry = self.add_entry(manager, "Y Position:", y_offset, str(obstacle.position[1]) if obstacle else "0")
-        y_offset += 30
-        self.width_entry = self.add_entry(manager, "Width:", y_offset, str(obstacle.size[0]) if obstacle else "1")
-        y_offset += 30
-        self.height_entry = self.add_entry(manager, "Height:", y_offset, str(obstacle.size[1]) if obstacle else "1")
-        
-        self.save_button = pygame_gui.elements.UIButton(
-            relative_rect=pygame.Rect((10, y_offset + 30), (100, 30)),
-            text="Save",
-            container=self,
-            manager=manager
-        )
-
-    def add_entry(self, manager, label, y_offset, default_value):
-        pygame_gui.elements.UILabel(
-            relative_rect=pygame.Rect((10, y_offset), (100, 20)),
-            text=label,
-            container=self,
-            manager=manager
-        )
-        return pygame_gui.elements.UITextEntryLine(
-            relative_rect=pygame.Rect((120, y_offset), (100, 20)),
-            container=self,
-            manager=manager,
-            initial_text=default_value
-        )
-
-    def process_event(self, event):
-        handled = super().process_event(event)
-        
-        if event.type == pygame_gui.UI_BUTTON_PRESSED:
-            if event.ui_element == self.save_button:
-                self.save_obstacle()
-                handled = True
+    @property
+    def obstacle_tree(self):
+        if self._obstacle_tree is None:
+            self._obstacle_tree = ObstacleTree([o.position for o in self.obstacles],
+                                               [o.size for o in self.obstacles])
+        return self._obstacle_tree
+
+    def advance(self, frame_time):
+        if self.paused:
+            self.accumulator = 0.0
+            return 0
+        self.accumulator += frame_time
+        steps = min(int(self.accumulator // self.fixed_dt), self.max_substeps)
+        for step in range(steps):
+            if step == steps - 1:
+                self._previous_positions = self.positions.copy()
+                self._previous_version = self.version
+            self.update(self.fixed_dt)
+            self.accumulator -= self.fixed_dt
+        # When the frame budget is exceeded, drop the backlog instead of
+        # trying to catch up on later frames.
+        if steps == self.max_substeps:
+            self.accumulator = min(self.accumulator, self.fixed_dt)
+        return steps
 
-        return handled
+    @property
+    def interpolation_alpha(self):
+        return min(self.accumulator / self.fixed_dt, 1.0)
+
+    def render_positions(self):
+        # Paused, or with objects added, removed or edited since the last
+        # step, the live state is drawn as is.
+        previous = self._previous_positions
+        if self.paused or previous is None or self._previous_version != self.version:
+            return self.positions
+        return previous + (self.positions - previous) * self.interpolation_alpha
+
+    def run(self, steps, dt):
+        for _ in range(steps):
+            self.update(dt)
+        return self
+
+    def update(self, dt):
+        if self.paused:
+            return
+        self.time += dt
+        start = self.positions.copy() if self.continuous else None
+        self.integrate(dt)
+        if start is not None:
+            self.resolve_swept_collisions(start, dt)
+        self._record_trails()
+        pairs = self.handle_collisions()
+        if self.sleep_time is not None:
+            self._update_sleep(dt, pairs)
+        for observer in self.observers:
+            observer(self)
+
+    def acceleration(self, positions, velocities, index=None):
+        # index gives the world rows of positions when they are a subset,
+        # e.g. the awake bodies; every body still attracts them.
+        a = -self.air_resistance * velocities
+        a[:, 1] -= self.gravity
+        if self.mutual_gravity is not None:
+            if index is None:
+                sources = positions
+            else:
+                sources = self.positions.copy()
+                sources[index] = positions
+            if self.mutual_gravity == 'barnes_hut':
+                tree = self._gravity_tree
+                if tree is None:
+                    tree = QuadTree(sources, self.masses)
+                    if self._stepping:
+                        self._gravity_tree = tree
+                else:
+                    tree.refit(sources)
+                a += tree.accelerations(index, self.opening_angle, self.softening, self.gravitational_constant)
+            elif self.mutual_gravity == 'direct':
+                a += direct_accelerations(sources, self.masses, index, self.softening,
+                                          self.gravitational_constant)
+            else:
+                raise ValueError(f"Unknown mutual gravity mode {self.mutual_gravity!r}")
+        return a
 
-    def save_obstacle(self):
+    def integrate(self, dt):
+        awake = self._awake_index()
+        if awake is None:
+            positions, velocities = self.positions, self.velocities
+        else:
+            positions, velocities = self.positions[awake], self.velocities[awake]
+        acceleration = self.acceleration if awake is None else lambda p, v: self.acceleration(p, v, awake)
+        self._stepping = True
         try:
-            x = float(self.x_entry.get_text())
-            y = float(self.y_entry.get_text())
-            width = float(self.width_entry.get_text())
-            height = float(self.height_entry.get_text())
-            
-            if self.obstacle:
-                self.obstacle.position = np.array([x, y])
-                self.obstacle.size = np.array([width, height])
+            if self.tolerance is None:
+                step, _ = INTEGRATORS[self.integrator]
+                step(acceleration, positions, velocities, dt)
             else:
-                new_obstacle = Obstacle([x, y], [width, height])
-                self.visualizer.sim.add_obstacle(new_obstacle)
-            
-            self.kill()
-        except ValueError:
-            error_dialog = pygame_gui.windows.UIMessageWindow(
-                rect=pygame.Rect((self.rect.x + 50, self.rect.y + 50), (300, 150)),
-                manager=self.ui_manager,
-                window_title="Error",
-                html_message="Invalid input. Please enter numeric values."
-            )
-
-class EditPropertiesDialog(UIWindow):
-    def __init__(self, manager, rect, obj, visualizer):
-        super().__init__(rect, manager, window_display_title="Edit Properties")
-        self.obj = obj
-        self.visualizer = visualizer
-        self.ui_manager = manager
-
-        y_offset = 20
-        self.mass_entry = self.add_entry(manager, "Mass:", y_offset, str(obj.mass))
-        y_offset += 30
-        self.x_entry = self.add_entry(manager, "X Position:", y_offset, str(obj.position[0]))
-        y_offset += 30
-        self.y_entry = self.add_entry(manager, "Y Position:", y_offset, str(obj.position[1]))
-        y_offset += 30
-        self.vx_entry = self.add_entry(manager, "X Velocity:", y_offset, str(obj.velocity[0]))
-        y_offset += 30
-        self.vy_entry = self.add_entry(manager, "Y Velocity:", y_offset, str(obj.velocity[1]))
-        y_offset += 30
-
-        # Add elasticity slider
-        pygame_gui.elements.UILabel(
-            relative_rect=pygame.Rect((10, y_offset), (100, 20)),
-            text="Elasticity:",
-            container=self,
-            manager=manager
-        )
-        self.elasticity_slider = pygame_gui.elements.UIHorizontalSlider(
-            relative_rect=pygame.Rect((120, y_offset), (150, 20)),
-            start_value=obj.elasticity,
-            value_range=(0, 1),
-            container=self,
-            manager=manager
-        )
-        y_offset += 30
-        
-        self.save_button = pygame_gui.elements.UIButton(
-            relative_rect=pygame.Rect((10, y_offset), (100, 30)),
-            text="Save",
-            container=self,
-            manager=manager
-        )
-
-    def add_entry(self, manager, label, y_offset, default_value):
-        pygame_gui.elements.UILabel(
-            relative_rect=pygame.Rect((10, y_offset), (100, 20)),
-            text=label,
-            container=self,
-            manager=manager
-        )
-        return pygame_gui.elements.UITextEntryLine(
-            relative_rect=pygame.Rect((120, y_offset), (100, 20)),
-            container=self,
-            manager=manager,
-            initial_text=default_value
-        )
-
-    def process_event(self, event):
-        handled = super().process_event(event)
-        
-        if event.type == pygame_gui.UI_BUTTON_PRESSED:
-            if event.ui_element == self.save_button:
-                self.save_properties()
-                handled = True
+                self.adaptive_dt = adaptive_integrate(self.integrator, acceleration,
+                                                      positions, velocities, dt,
+                                                      self.tolerance, self.adaptive_dt or dt)
+        finally:
+            self._stepping = False
+            self._gravity_tree = None
+        if awake is not None:
+            self.positions[awake] = positions
+            self.velocities[awake] = velocities
 
-        return handled
+    def handle_collisions(self):
+        positions, velocities = self.positions, self.velocities
+        grounded = positions[:, 1] <= 0
+        positions[grounded, 1] = 0
+        velocities[grounded, 1] *= -self.elasticities[grounded]
+
+        pairs = self.contact_pairs()
+        if self._awake_index() is not None:
+            self._wake_on_contact(pairs)
+        self.resolve_collisions(pairs)
+        self.resolve_obstacle_collisions(self.obstacle_contacts())
+        # Gentle contacts do not wake a sleeping body, and it stays at rest.
+        velocities[self.asleep] = 0
+        return pairs
+
+    def contact_pairs(self):
+        awake = self._awake_index()
+        if awake is None:
+            return grid_pairs(self.positions)
+        if 2 * len(awake) > len(self.objects):
+            # Mostly awake: hashing everyone once is cheaper than querying the
+            # awake bodies against a separate grid of sleepers.
+            pairs = grid_pairs(self.positions)
+            asleep = self.asleep
+            return pairs[~(asleep[pairs[:, 0]] & asleep[pairs[:, 1]])]
+        among_awake = awake[grid_pairs(self.positions[awake])]
+        sleepers, grid = self._sleeping_index()
+        touching = grid.query(self.positions[awake])
+        return canonical_pairs(np.concatenate([among_awake[:, 0], awake[touching[:, 0]]]),
+                               np.concatenate([among_awake[:, 1], sleepers[touching[:, 1]]]))
+
+    def _awake_index(self):
+        # None when every body is awake, so callers can use whole arrays.
+        asleep = self.asleep
+        if not asleep.any():
+            return None
+        return np.flatnonzero(~asleep)
+
+    def _sleeping_index(self):
+        # Sleeping bodies do not move, so their grid is only rebuilt when the
+        # set of sleepers changes.
+        if self._sleeping_grid is None:
+            sleepers = np.flatnonzero(self.asleep)
+            self._sleeping_grid = (sleepers, UniformGrid(self.positions[sleepers]))
+        return self._sleeping_grid
+
+    def kinetic_energies(self):
+        return 0.5 * self.masses * np.einsum('ij,ij->i', self.velocities, self.velocities)
+
+    def _wake_on_contact(self, pairs):
+        if len(pairs) == 0:
+            return
+        i, j = pairs[:, 0], pairs[:, 1]
+        asleep = self.asleep
+        moving = self.kinetic_energies() > self.sleep_energy
+        hit = (asleep[i] & moving[j]) | (asleep[j] & moving[i])
+        if hit.any():
+            self._wake_islands(np.where(asleep[i], i, j)[hit])
+
+    def _wake_islands(self, indices):
+        woken = self.asleep & np.isin(self.islands, self.islands[indices])
+        woken[indices] = True
+        self.asleep[woken] = False
+        self.sleep_timers[woken] = 0
+        self._sleeping_grid = None
+
+    def wake(self, obj):
+        if self.asleep[obj.index]:
+            self._wake_islands(np.array([obj.index]))
+
+    def wake_all(self):
+        if self.asleep.any():
+            self.asleep[:] = False
+            self.sleep_timers[:] = 0
+            self._sleeping_grid = None
+
+    def _update_sleep(self, dt, pairs):
+        asleep, timers = self.asleep, self.sleep_timers
+        awake = ~asleep
+        calm = self.kinetic_energies() < self.sleep_energy
+        timers[awake] = np.where(calm[awake], timers[awake] + dt, 0)
+
+        labels = contact_islands(len(self.objects), pairs)
+        island_time = np.full(len(self.objects), np.inf)
+        np.minimum.at(island_time, labels, timers)
+        ready = awake & (island_time[labels] >= self.sleep_time)
+        if ready.any():
+            asleep[ready] = True
+            self.velocities[ready] = 0
+            self.islands[ready] = labels[ready] + self._next_island
+            self._next_island += len(self.objects)
+            self._sleeping_grid = None
 
-    def save_properties(self):
-        try:
-            self.obj.mass = float(self.mass_entry.get_text())
-            self.obj.position[0] = float(self.x_entry.get_text())
-            self.obj.position[1] = float(self.y_entry.get_text())
-            self.obj.velocity[0] = float(self.vx_entry.get_text())
-            self.obj.velocity[1] = float(self.vy_entry.get_text())
-            self.obj.elasticity = self.elasticity_slider.get_current_value()
-            self.kill()
-        except ValueError:
-            error_dialog = pygame_gui.windows.UIMessageWindow(
-                rect=pygame.Rect((self.rect.x + 50, self.rect.y + 50), (300, 150)),
-                manager=self.ui_manager,
-                window_title="Error",
-                html_message="Invalid input. Please enter numeric values."
-            )
-
-
-def main():
-    sim = Simulation()
-    vis = Visualizer(800, 600)
-    vis.sim = sim  # Set the simulation reference in the visualizer
-
-    running = True
-    while running:
-        time_delta = vis.clock.tick(60) / 1000.0
-        
-        running = vis.handle_events(sim)
+    def resolve_collision(self, obj1, obj2):
+        self.resolve_collisions(np.array([[obj1.index, obj2.index]]))
+
+    def resolve_collisions(self, pairs):
+        # Contacts are applied in batches in which no body appears twice, each
+        # batch from the velocities the batches before it left, so a body in
+        # several contacts is resolved one contact at a time as it would be
+        # in a loop over the pairs. Only approaching pairs are resolved; a
+        # pair that starts to approach during the pass is left to the next
+        # step.
+        pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+        if len(pairs) == 0:
+            return
+        positions, velocities = self.positions, self.velocities
+        masses, elasticities = self.masses, self.elasticities
+        pairs = pairs[self._closing(pairs) < 0]
+        for batch in contact_batches(len(self.objects), pairs):
+            i, j = pairs[batch, 0], pairs[batch, 1]
+            offset = positions[i] - positions[j]
+            closing = np.einsum('ij,ij->i', velocities[i] - velocities[j], offset)
+            # Earlier batches may have turned some of these pairs around.
+            approaching = closing < 0
+            i, j, offset, closing = i[approaching], j[approaching], offset[approaching], closing[approaching]
+            scale = 2 * closing / ((masses[i] + masses[j]) * np.einsum('ij,ij->i', offset, offset))
+            impulse = scale[:, None] * offset
+            velocities[i] -= impulse * (masses[j] * elasticities[i])[:, None]
+            velocities[j] += impulse * (masses[i] * elasticities[j])[:, None]
+
+    def _closing(self, pairs):
+        # Negative for pairs moving towards each other. Coincident pairs have
+        # no contact normal and come out as 0.
+        i, j = pairs[:, 0], pairs[:, 1]
+        offset = self.positions[i] - self.positions[j]
+        return np.einsum('ij,ij->i', self.velocities[i] - self.velocities[j], offset)
+
+    def resolve_swept_collisions(self, start, dt):
+        # Each fast body is rewound to its earliest contact in the step,
+        # resolved there and then moved on with its new velocity for the rest
+        # of the step. Later contacts in the same step, and ties, are left to
+        # the discrete pass and the next step.
+        positions, velocities = self.positions, self.velocities
+        motion = positions - start
+        fast = np.flatnonzero(np.einsum('ij,ij->i', motion, motion) > (CONTACT_DISTANCE / 2)**2)
+        if len(fast) == 0:
+            return
+        pairs, pair_toi = swept_pairs(start, positions, fast)
+        hits, hit_toi, normals = self.obstacle_tree.sweep(start[fast], positions[fast])
+        hit_body = fast[hits[:, 0]]
+
+        earliest = np.full(len(self.objects), np.inf)
+        np.minimum.at(earliest, pairs[:, 0], pair_toi)
+        np.minimum.at(earliest, pairs[:, 1], pair_toi)
+        np.minimum.at(earliest, hit_body, hit_toi)
+
+        first = hit_toi == earliest[hit_body]
+        hit_body, hit_toi, normals = hit_body[first], hit_toi[first], normals[first]
+        hit_body, unique = np.unique(hit_body, return_index=True)
+        hit_toi, normals = hit_toi[unique], normals[unique]
+
+        first = (pair_toi == earliest[pairs[:, 0]]) & (pair_toi == earliest[pairs[:, 1]])
+        first &= ~np.isin(pairs, hit_body).any(axis=1)
+        pairs, pair_toi = pairs[first], pair_toi[first]
+        once = np.bincount(pairs.ravel(), minlength=len(self.objects)) == 1
+        single = once[pairs[:, 0]] & once[pairs[:, 1]]
+        pairs, pair_toi = pairs[single], pair_toi[single]
+
+        bodies = np.concatenate([hit_body, pairs[:, 0], pairs[:, 1]])
+        toi = np.concatenate([hit_toi, pair_toi, pair_toi])
+        positions[bodies] = start[bodies] + motion[bodies] * toi[:, None]
+
+        v_normal = np.einsum('ij,ij->i', velocities[hit_body], normals)
+        bounce = np.minimum(v_normal, 0) * (1 + self.elasticities[hit_body])
+        velocities[hit_body] -= bounce[:, None] * normals
+        self.resolve_collisions(pairs)
+
+        positions[bodies] += velocities[bodies] * ((1 - toi) * dt)[:, None]
+
+    def _sum_by_index(self, index, values):
+        n = len(self.objects)
+        return np.stack([np.bincount(index, values[:, k], minlength=n)
+                         for k in range(values.shape[1])], axis=1)
+
+    def obstacle_contacts(self):
+        awake = self._awake_index()
+        if awake is None:
+            return self.obstacle_tree.query(self.positions)
+        contacts = self.obstacle_tree.query(self.positions[awake])
+        contacts[:, 0] = awake[contacts[:, 0]]
+        return contacts
+
+    def resolve_obstacle_collision(self, obj, obstacle):
+        normal = np.sign(obj.position - obstacle.position)
+        v_normal = np.dot(obj.velocity, normal) * normal
+        v_tangent = obj.velocity - v_normal
         
-        sim.update(1/60)  # Update at 60 FPS
-        vis.draw(sim)
-        vis.ui_manager.update(time_delta)
+        # Reflect the normal component and apply elasticity
+        obj.velocity = v_tangent - v_normal * obj.elasticity
 
-    pygame.quit()
+    def resolve_obstacle_collisions(self, contacts):
+        # Same reflection as resolve_obstacle_collision for every (body,
+        # obstacle) contact, summed per body.
+        contacts = np.asarray(contacts, dtype=np.intp).reshape(-1, 2)
+        if len(contacts) == 0:
+            return
+        i, k = contacts[:, 0], contacts[:, 1]
+        velocities = self.velocities
+        normal = np.sign(self.positions[i] - self.obstacle_tree.centers[k])
+        v_normal = np.einsum('ij,ij->i', velocities[i], normal)[:, None] * normal
+        velocities -= self._sum_by_index(i, v_normal * (1 + self.elasticities[i])[:, None])
+
+# The GUI lives in newton_opt_gui so that importing the engine does not pull
+# in pygame, pygame_gui or a display. Its names stay reachable from here.
+_GUI_NAMES = {'Visualizer', 'ObjectMenuDialog', 'ObstacleEditorDialog', 'EditPropertiesDialog', 'main'}
+
+def __getattr__(name):
+    if name in _GUI_NAMES:
+        import newton_opt_gui
+        return getattr(newton_opt_gui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import sys
+    from newton_opt_gui import main
+    main(threaded='--threaded' in sys.argv[1:])
@@ -0,0 +1,627 @@
+import pygame
+import pygame_gui
+import numpy as np
+import time
+from pygame_gui.elements import UIWindow
+from newton_opt import PhysicsObject, Obstacle, Simulation
+from runner import SimulationThread
+
+class Visualizer:
+    def __init__(self, width, height):
+        pygame.init()
+        self.width = width
+        self.height = height
+        self.screen = pygame.display.set_mode((width, height))
+        self.clock = pygame.time.Clock()
+        self.ui_manager = pygame_gui.UIManager((width, height))
+        self.selected_object = None
+        self.font = pygame.font.Font(None, 24)
+        self.tracking_object = None
+        self.sim = None  # We'll set this in the main function
+        # What was last drawn: the simulation, or the runner.Frame taken from
+        # it. Object state shown in the UI is read from here.
+        self.view = None
+        # Set when the simulation steps on a runner.SimulationThread; edits
+        # then go through its command queue.
+        self.runner = None
+        self.last_click_time = 0
+        # Per-style sprites and the style of each object, rebuilt when the
+        # zoom or the simulation's object list changes.
+        self._sprites = {}
+        self._sprite_zoom = None
+        self._style_version = None
+        # Screen positions of the objects drawn last frame, for picking.
+        self._pick_state = None
+        self.double_click_threshold = 0.3  # 300 milliseconds
+        self.zoom_level = 1.0
+        self.x_min, self.x_max = -10, 10
+        self.y_min, self.y_max = 0, 20
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.spawn_button = pygame_gui.elements.UIButton(
+            relative_rect=pygame.Rect((10, 10), (100, 30)),
+            text='Spawn Object',
+            manager=self.ui_manager
+        )
+        self.add_obstacle_button = pygame_gui.elements.UIButton(
+            relative_rect=pygame.Rect((120, 10), (100, 30)),
+            text='Add Obstacle',
+            manager=self.ui_manager
+        )
+        self.pause_button = pygame_gui.elements.UIButton(
+            relative_rect=pygame.Rect((230, 10), (100, 30)),
+            text='Pause',
+            manager=self.ui_manager
+        )
+        self.gravity_slider = pygame_gui.elements.UIHorizontalSlider(
+            relative_rect=pygame.Rect((10, 50), (200, 20)),
+            start_value=9.8,
+            value_range=(0, 20),
+            manager=self.ui_manager
+        )
+        self.air_resistance_slider = pygame_gui.elements.UIHorizontalSlider(
+            relative_rect=pygame.Rect((10, 80), (200, 20)),
+            start_value=0.1,
+            value_range=(0, 1),
+            manager=self.ui_manager
+        )
+        self.zoom_in_button = pygame_gui.elements.UIButton(
+            relative_rect=pygame.Rect((340, 10), (50, 30)),
+            text='+',
+            manager=self.ui_manager
+        )
+        self.zoom_out_button = pygame_gui.elements.UIButton(
+            relative_rect=pygame.Rect((400, 10), (50, 30)),
+            text='-',
+            manager=self.ui_manager
+        )
+
+    def draw(self, sim):
+        self.view = sim
+        self.screen.fill((255, 255, 255))
+        
+        screen_positions = self.world_to_screen_array(sim.render_positions())
+        self.draw_objects(sim, screen_positions)
+        self.draw_trails(sim)
+
+        for obstacle in sim.obstacles:
+            self.draw_obstacle(obstacle)
+
+        self.draw_info(sim)
+        self.ui_manager.draw_ui(self.screen)
+        pygame.display.flip()
+
+        if self.tracking_object:
+            self.center_on_tracked_object(sim)
+
+    def visible(self, lower, upper):
+        return (upper[..., 0] >= 0) & (lower[..., 0] < self.width) & \
+               (upper[..., 1] >= 0) & (lower[..., 1] < self.height)
+
+    def sprite(self, shape, color):
+        if self._sprite_zoom != self.zoom_level:
+            self._sprites = {}
+            self._sprite_zoom = self.zoom_level
+        key = (shape, color)
+        if key not in self._sprites:
+            if shape == 'circle':
+                radius = int(10 * self.zoom_level)
+                surface = pygame.Surface((2 * radius + 1, 2 * radius + 1), pygame.SRCALPHA)
+                pygame.draw.circle(surface, color, (radius, radius), radius)
+                offset = radius
+            elif shape == 'square':
+                size = int(20 * self.zoom_level)
+                surface = pygame.Surface((size, size))
+                surface.fill(color)
+                offset = size // 2
+            else:
+                surface, offset = None, 0
+            self._sprites[key] = (surface, offset)
+        return self._sprites[key]
+
+    def object_styles(self, sim):
+        # Objects sharing a shape and colour share a sprite and are blitted
+        # in one call.
+        if self._style_version != sim.version:
+            styles = {}
+            ids = [styles.setdefault((obj.shape, tuple(obj.color)), len(styles)) for obj in sim.objects]
+            self._style_keys = list(styles)
+            self._style_ids = np.array(ids, dtype=np.intp)
+            self._style_version = sim.version
+        return self._style_keys, self._style_ids
+
+    def draw_objects(self, sim, screen_positions):
+        keys, style_ids = self.object_styles(sim)
+        margin = int(14 * self.zoom_level)
+        shown = np.flatnonzero(self.visible(screen_positions - margin, screen_positions + margin))
+        self._pick_state = (sim.version, self.zoom_level, screen_positions, shown)
+        shown = shown[np.argsort(style_ids[shown], kind='stable')]
+        groups = np.split(shown, np.flatnonzero(np.diff(style_ids[shown])) + 1)
+        blit = getattr(self.screen, 'fblits', self.screen.blits)
+        for group in groups:
+            if len(group) == 0:
+                continue
+            surface, offset = self.sprite(*keys[style_ids[group[0]]])
+            if surface is not None:
+                blit([(surface, dest) for dest in (screen_positions[group] - offset).tolist()])
+
+        for obj, color, radius in ((self.selected_object, (255, 0, 0), 12),
+                                   (self.tracking_object, (0, 255, 0), 14)):
+            row = sim.row_of(obj) if obj is not None else None
+            if row is not None:
+                center = screen_positions[row].tolist()
+                pygame.draw.circle(self.screen, color, center, int(radius * self.zoom_level), 2)
+
+    def draw_obstacle(self, obstacle):
+        screen_x, screen_y = self.world_to_screen(obstacle.position)
+        width = int(obstacle.size[0] * 20 * self.zoom_level)
+        height = int(obstacle.size[1] * 20 * self.zoom_level)
+        if screen_x + width // 2 < 0 or screen_x - width // 2 >= self.width or \
+           screen_y + height // 2 < 0 or screen_y - height // 2 >= self.height:
+            return
+        pygame.draw.rect(self.screen, (100, 100, 100), 
+                         (screen_x - width//2, screen_y - height//2, width, height))
+
+    def draw_trails(self, sim):
+        if sim.trail_length == 0:
+            return
+        counts = sim.trail_counts
+        drawn = np.flatnonzero(counts > 1)
+        points = self.world_to_screen_array(sim.trail_history()[drawn])
+        # Only the last counts[i] samples of row i have been written.
+        valid = np.arange(sim.trail_length) >= (sim.trail_length - counts[drawn])[:, None]
+        lower = np.where(valid[..., None], points, np.iinfo(points.dtype).max).min(axis=1)
+        upper = np.where(valid[..., None], points, np.iinfo(points.dtype).min).max(axis=1)
+        for row in np.flatnonzero(self.visible(lower, upper)):
+            index = drawn[row]
+            pygame.draw.lines(self.screen, sim.objects[index].color, False,
+                              points[row, sim.trail_length - counts[index]:].tolist(), 2)
+
+    def apply(self, command):
+        # Runs command(sim) on the simulation, between steps when it runs on
+        # a thread.
+        if self.runner is not None:
+            self.runner.submit(command)
+        else:
+            command(self.sim)
+
+    def draw_info(self, sim):
+        info_text = f"Time: {sim.time:.2f}s  Gravity: {sim.gravity:.2f}  Air Resistance: {sim.air_resistance:.2f}"
+        info_surface = self.font.render(info_text, True, (0, 0, 0))
+        self.screen.blit(info_surface, (10, self.height - 30))
+
+        row = sim.row_of(self.selected_object) if self.selected_object else None
+        if row is not None:
+            mass, position, velocity = sim.masses[row], sim.positions[row], sim.velocities[row]
+            obj_info = f"Mass: {mass:.2f}  Pos: ({position[0]:.2f}, {position[1]:.2f})  Vel: ({velocity[0]:.2f}, {velocity[1]:.2f})"
+            obj_surface = self.font.render(obj_info, True, (0, 0, 0))
+            self.screen.blit(obj_surface, (10, self.height - 60))
+
+    def handle_events(self, sim):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+            
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:  # Left click
+                    self.handle_object_selection(sim, event.pos)
+                elif event.button == 3:  # Right click
+                    self.handle_obstacle_selection(sim, event.pos)
+            
+            if event.type == pygame_gui.UI_BUTTON_PRESSED:
+                if event.ui_element == self.spawn_button:
+                    self.spawn_object(sim)
+                elif event.ui_element == self.add_obstacle_button:
+                    self.open_obstacle_editor()
+                elif event.ui_element == self.pause_button:
+                    paused = not sim.paused
+                    self.apply(lambda sim: setattr(sim, 'paused', paused))
+                    self.pause_button.set_text('Resume' if paused else 'Pause')
+                elif event.ui_element == self.zoom_in_button:
+                    self.zoom_level *= 1.1
+                elif event.ui_element == self.zoom_out_button:
+                    self.zoom_level /= 1.1
+
+            if event.type == pygame_gui.UI_HORIZONTAL_SLIDER_MOVED:
+                value = event.value
+                if event.ui_element == self.gravity_slider:
+                    self.apply(lambda sim: setattr(sim, 'gravity', value))
+                elif event.ui_element == self.air_resistance_slider:
+                    self.apply(lambda sim: setattr(sim, 'air_resistance', value))
+            
+            self.ui_manager.process_events(event)
+        
+        return True
+
+    def world_to_screen(self, position):
+        x, y = position
+        screen_x = int((x - self.x_min) / (self.x_max - self.x_min) * self.width * self.zoom_level)
+        screen_y = int((self.y_max - y) / (self.y_max - self.y_min) * self.height * self.zoom_level)
+        return screen_x, screen_y
+
+    def world_to_screen_array(self, positions):
+        scale = np.array([self.width / (self.x_max - self.x_min),
+                          -self.height / (self.y_max - self.y_min)]) * self.zoom_level
+        origin = np.array([self.x_min, self.y_max])
+        return ((positions - origin) * scale).astype(int)
+
+    def spawn_object(self, sim):
+        new_object = PhysicsObject(
+            mass=1.0,
+            position=[np.random.uniform(-5, 5), np.random.uniform(5, 15)],
+            velocity=[np.random.uniform(-5, 5), np.random.uniform(-5, 5)],
+            shape='circle'
+        )
+        self.apply(lambda sim: sim.add_object(new_object))
+
+    def open_obstacle_editor(self, obstacle=None):
+        editor_dialog = ObstacleEditorDialog(
+            self.ui_manager,
+            pygame.Rect((self.width/2 - 150, self.height/2 - 125), (300, 250)),
+            self,
+            obstacle
+        )
+
+    def pick_object(self, sim, mouse_pos):
+        # Nearest object drawn within the pick radius of mouse_pos, or None.
+        # One pass over the drawn positions; a click is rare enough that
+        # building an index for it costs more than it saves.
+        state = self._pick_state
+        if state is None or state[:2] != (sim.version, self.zoom_level):
+            screen_positions = self.world_to_screen_array(sim.render_positions())
+            state = (sim.version, self.zoom_level, screen_positions, np.arange(len(sim.objects)))
+            self._pick_state = state
+        screen_positions, shown = state[2], state[3]
+        if len(shown) == 0:
+            return None
+        offsets = screen_positions[shown] - np.asarray(mouse_pos)
+        distance_sq = np.einsum('ij,ij->i', offsets, offsets)
+        nearest = np.argmin(distance_sq)
+        if distance_sq[nearest] >= (15 * self.zoom_level)**2:
+            return None
+        return sim.objects[shown[nearest]]
+
+    def handle_object_selection(self, sim, mouse_pos):
+        current_time = time.time()
+        obj = self.pick_object(sim, mouse_pos)
+        if obj is not None:
+            if obj == self.selected_object:
+                # Check for double-click
+                if current_time - self.last_click_time < self.double_click_threshold:
+                    print(f"Double-click detected on object: {obj}")
+                    self.open_object_menu()
+                else:
+                    print(f"Single click on selected object: {obj}")
+            else:
+                self.selected_object = obj
+                print(f"Object selected: {obj}")
+            self.last_click_time = current_time
+            return
+
+        self.selected_object = None
+        print("No object selected")
+
+    def object_state(self, obj):
+        # (mass, position, velocity, elasticity) of obj as last drawn, or
+        # None if it was not drawn.
+        view = self.view
+        row = view.row_of(obj) if view is not None and obj is not None else None
+        if row is None:
+            return None
+        return view.masses[row], view.positions[row], view.velocities[row], view.elasticities[row]
+
+    def center_on_tracked_object(self, sim):
+        row = sim.row_of(self.tracking_object) if self.tracking_object else None
+        if row is not None:
+            x, y = sim.positions[row]
+            center_x = (self.x_min + self.x_max) / 2
+            center_y = (self.y_min + self.y_max) / 2
+            offset_x = x - center_x
+            offset_y = y - center_y
+            
+            self.x_min += offset_x
+            self.x_max += offset_x
+            self.y_min += offset_y
+            self.y_max += offset_y
+
+    def open_object_menu(self):
+        if self.selected_object:
+            print(f"Opening menu for object: {self.selected_object}")
+            menu_dialog = ObjectMenuDialog(
+                self.ui_manager,
+                pygame.Rect((self.width/2 - 200, self.height/2 - 150), (400, 300)),
+                self
+        )
+        else:
+            print("No object selected when trying to open menu")
+
+class ObjectMenuDialog(UIWindow):
+    def __init__(self, manager, rect, visualizer):
+        super().__init__(rect, manager, window_display_title="Object Menu")
+        
+        self.visualizer = visualizer
+        self.selected_object = visualizer.selected_object
+        self.ui_manager = manager
+
+        # Add custom buttons
+        button_layout_rect = pygame.Rect(0, 0, 180, 30)
+        self.edit_button = pygame_gui.elements.UIButton(
+            relative_rect=button_layout_rect.move(10, 60),
+            text="Edit Properties",
+            container=self,
+            manager=manager
+        )
+        self.delete_button = pygame_gui.elements.UIButton(
+            relative_rect=button_layout_rect.move(10, 100),
+            text="Delete Object",
+            container=self,
+            manager=manager
+        )
+        self.track_button = pygame_gui.elements.UIButton(
+            relative_rect=button_layout_rect.move(10, 140),
+            text="Track Object",
+            container=self,
+            manager=manager
+        )
+
+    def process_event(self, event):
+        handled = super().process_event(event)
+        
+        if event.type == pygame_gui.UI_BUTTON_PRESSED:
+            if event.ui_element == self.edit_button:
+                self.open_edit_properties_dialog()
+            elif event.ui_element == self.delete_button:
+                self.delete_object()
+            elif event.ui_element == self.track_button:
+                self.toggle_tracking()
+            handled = True
+
+        return handled
+
+    def open_edit_properties_dialog(self):
+        if self.selected_object:
+            edit_dialog = EditPropertiesDialog(
+                self.ui_manager,
+                pygame.Rect((self.rect.x + 50, self.rect.y + 50), (300, 250)),
+                self.selected_object,
+                self.visualizer
+        )
+
+    def delete_object(self):
+        if self.selected_object:
+            obj = self.selected_object
+            self.visualizer.apply(lambda sim: sim.remove_object(obj) if obj.sim is sim else None)
+            self.visualizer.selected_object = None
+            self.kill()
+
+    def toggle_tracking(self):
+        if self.selected_object:
+            if self.visualizer.tracking_object == self.selected_object:
+                self.visualizer.tracking_object = None
+            else:
+                self.visualizer.tracking_object = self.selected_object
+            self.kill()
+
+    def process_event(self, event):
+        handled = super().process_event(event)
+        
+        if event.type == pygame_gui.UI_BUTTON_PRESSED:
+            if event.ui_element == self.edit_button:
+                self.open_edit_properties_dialog()
+            elif event.ui_element == self.delete_button:
+                self.delete_object()
+            elif event.ui_element == self.track_button:
+                self.toggle_tracking()
+            handled = True
+
+        return handled
+
+    def open_edit_properties_dialog(self):
+        if self.visualizer.object_state(self.selected_object) is not None:
+            edit_dialog = EditPropertiesDialog(self.ui_manager, pygame.Rect((self.rect.x + 50, self.rect.y + 50), (300, 250)), self.selected_object, self.visualizer)
+            edit_dialog.set_blocking(True)
+
+    def delete_object(self):
+        if self.selected_object:
+            obj = self.selected_object
+            self.visualizer.apply(lambda sim: sim.remove_object(obj) if obj.sim is sim else None)
+            self.visualizer.selected_object = None
+            self.kill()
+
+    def toggle_tracking(self):
+        if self.selected_object:
+            if self.visualizer.tracking_object == self.selected_object:
+                self.visualizer.tracking_object = None
+            else:
+                self.visualizer.tracking_object = self.selected_object
+            self.kill()
+
+class ObstacleEditorDialog(UIWindow):
+    def __init__(self, manager, rect, visualizer, obstacle=None):
+        super().__init__(rect, manager, window_display_title="Obstacle Editor")
+        self.visualizer = visualizer
+        self.obstacle = obstacle
+
+        y_offset = 20
+        self.x_entry = self.add_entry(manager, "X Position:", y_offset, str(obstacle.position[0]) if obstacle else "0")
+        y_offset += 30
+        self.y_entry = self.add_entry(manager, "Y Position:", y_offset, str(obstacle.position[1]) if obstacle else "0")
+        y_offset += 30
+        self.width_entry = self.add_entry(manager, "Width:", y_offset, str(obstacle.size[0]) if obstacle else "1")
+        y_offset += 30
+        self.height_entry = self.add_entry(manager, "Height:", y_offset, str(obstacle.size[1]) if obstacle else "1")
+        
+        self.save_button = pygame_gui.elements.UIButton(
+            relative_rect=pygame.Rect((10, y_offset + 30), (100, 30)),
+            text="Save",
+            container=self,
+            manager=manager
+        )
+
+    def add_entry(self, manager, label, y_offset, default_value):
+        pygame_gui.elements.UILabel(
+            relative_rect=pygame.Rect((10, y_offset), (100, 20)),
+            text=label,
+            container=self,
+            manager=manager
+        )
+        return pygame_gui.elements.UITextEntryLine(
+            relative_rect=pygame.Rect((120, y_offset), (100, 20)),
+            container=self,
+            manager=manager,
+            initial_text=default_value
+        )
+
+    def process_event(self, event):
+        handled = super().process_event(event)
+        
+        if event.type == pygame_gui.UI_BUTTON_PRESSED:
+            if event.ui_element == self.save_button:
+                self.save_obstacle()
+                handled = True
+
+        return handled
+
+    def save_obstacle(self):
+        try:
+            x = float(self.x_entry.get_text())
+            y = float(self.y_entry.get_text())
+            width = float(self.width_entry.get_text())
+            height = float(self.height_entry.get_text())
+            
+            obstacle = self.obstacle
+            if obstacle:
+                def edit(sim):
+                    obstacle.position = np.array([x, y])
+                    obstacle.size = np.array([width, height])
+                    sim.invalidate_obstacles()
+                self.visualizer.apply(edit)
+            else:
+                new_obstacle = Obstacle([x, y], [width, height])
+                self.visualizer.apply(lambda sim: sim.add_obstacle(new_obstacle))
+            
+            self.kill()
+        except ValueError:
+            error_dialog = pygame_gui.windows.UIMessageWindow(
+                rect=pygame.Rect((self.rect.x + 50, self.rect.y + 50), (300, 150)),
+                manager=self.ui_manager,
+                window_title="Error",
+                html_message="Invalid input. Please enter numeric values."
+            )
+
+class EditPropertiesDialog(UIWindow):
+    def __init__(self, manager, rect, obj, visualizer):
+        super().__init__(rect, manager, window_display_title="Edit Properties")
+        self.obj = obj
+        self.visualizer = visualizer
+        self.ui_manager = manager
+
+        mass, position, velocity, elasticity = visualizer.object_state(obj)
+        y_offset = 20
+        self.mass_entry = self.add_entry(manager, "Mass:", y_offset, str(mass))
+        y_offset += 30
+        self.x_entry = self.add_entry(manager, "X Position:", y_offset, str(position[0]))
+        y_offset += 30
+        self.y_entry = self.add_entry(manager, "Y Position:", y_offset, str(position[1]))
+        y_offset += 30
+        self.vx_entry = self.add_entry(manager, "X Velocity:", y_offset, str(velocity[0]))
+        y_offset += 30
+        self.vy_entry = self.add_entry(manager, "Y Velocity:", y_offset, str(velocity[1]))
+        y_offset += 30
+
+        # Add elasticity slider
+        pygame_gui.elements.UILabel(
+            relative_rect=pygame.Rect((10, y_offset), (100, 20)),
+            text="Elasticity:",
+            container=self,
+            manager=manager
+        )
+        self.elasticity_slider = pygame_gui.elements.UIHorizontalSlider(
+            relative_rect=pygame.Rect((120, y_offset), (150, 20)),
+            start_value=elasticity,
+            value_range=(0, 1),
+            container=self,
+            manager=manager
+        )
+        y_offset += 30
+        
+        self.save_button = pygame_gui.elements.UIButton(
+            relative_rect=pygame.Rect((10, y_offset), (100, 30)),
+            text="Save",
+            container=self,
+            manager=manager
+        )
+
+    def add_entry(self, manager, label, y_offset, default_value):
+        pygame_gui.elements.UILabel(
+            relative_rect=pygame.Rect((10, y_offset), (100, 20)),
+            text=label,
+            container=self,
+            manager=manager
+        )
+        return pygame_gui.elements.UITextEntryLine(
+            relative_rect=pygame.Rect((120, y_offset), (100, 20)),
+            container=self,
+            manager=manager,
+            initial_text=default_value
+        )
+
+    def process_event(self, event):
+        handled = super().process_event(event)
+        
+        if event.type == pygame_gui.UI_BUTTON_PRESSED:
+            if event.ui_element == self.save_button:
+                self.save_properties()
+                handled = True
+
+        return handled
+
+    def save_properties(self):
+        try:
+            obj = self.obj
+            mass = float(self.mass_entry.get_text())
+            position = [float(self.x_entry.get_text()), float(self.y_entry.get_text())]
+            velocity = [float(self.vx_entry.get_text()), float(self.vy_entry.get_text())]
+            elasticity = self.elasticity_slider.get_current_value()
+            def edit(sim):
+                obj.mass, obj.position, obj.velocity, obj.elasticity = mass, position, velocity, elasticity
+                if obj.sim is sim:
+                    sim.wake(obj)
+            self.visualizer.apply(edit)
+            self.kill()
+        except ValueError:
+            error_dialog = pygame_gui.windows.UIMessageWindow(
+                rect=pygame.Rect((self.rect.x + 50, self.rect.y + 50), (300, 150)),
+                manager=self.ui_manager,
+                window_title="Error",
+                html_message="Invalid input. Please enter numeric values."
+            )
+
+
+def main(threaded=False):
+    sim = Simulation()
+    sim.sleep_time = 0.5
+    vis = Visualizer(800, 600)
+    vis.sim = sim  # Set the simulation reference in the visualizer
+    if threaded:
+        vis.runner = SimulationThread(sim).start()
+
+    running = True
+    while running:
+        time_delta = vis.clock.tick(60) / 1000.0
+
+        if vis.runner is not None:
+            # Physics runs on its own thread; draw its latest frame.
+            frame = vis.runner.frame()
+            running = vis.handle_events(frame)
+            vis.draw(frame)
+        else:
+            running = vis.handle_events(sim)
+            sim.advance(time_delta)
+            vis.draw(sim)
+        vis.ui_manager.update(time_delta)
+
+    if vis.runner is not None:
+        vis.runner.stop()
+    pygame.quit()
@@ -0,0 +1,98 @@
+import json
+import os
+import numpy as np
+
+# Streams per-step object state to disk. A recording is a directory holding
+#   state.f64  raw (steps, n_objects, 4) float64 rows of x, y, vx, vy
+#   time.f64   raw (steps,) float64 simulation times
+#   meta.json  object count and layout
+# Steps are buffered in memory chunk_steps at a time and appended to the raw
+# files, so memory use stays bounded however long the run is.
+
+FIELDS = ['x', 'y', 'vx', 'vy']
+
+class TrajectoryRecorder:
+    def __init__(self, path, n_objects, chunk_steps=256, every=1):
+        self.path = path
+        self.n_objects = n_objects
+        self.every = every
+        self.steps = 0
+        self._calls = 0
+        self._buffer = np.empty((chunk_steps, n_objects, len(FIELDS)))
+        self._times = np.empty(chunk_steps)
+        self._fill = 0
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'n_objects': n_objects, 'fields': FIELDS, 'dtype': 'float64'}, f)
+        self._state_file = open(os.path.join(path, 'state.f64'), 'wb')
+        self._time_file = open(os.path.join(path, 'time.f64'), 'wb')
+
+    def __call__(self, sim):
+        self._calls += 1
+        if (self._calls - 1) % self.every:
+            return
+        if len(sim.objects) != self.n_objects:
+            raise ValueError(f"Recorder expects {self.n_objects} objects, simulation has {len(sim.objects)}")
+        row = self._buffer[self._fill]
+        row[:, :2] = sim.positions
+        row[:, 2:] = sim.velocities
+        self._times[self._fill] = sim.time
+        self._fill += 1
+        self.steps += 1
+        if self._fill == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        self._buffer[:self._fill].tofile(self._state_file)
+        self._times[:self._fill].tofile(self._time_file)
+        self._state_file.flush()
+        self._time_file.flush()
+        self._fill = 0
+
+    def close(self):
+        if not self._state_file.closed:
+            self.flush()
+            self._state_file.close()
+            self._time_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Trajectory:
+    # Read-only view of a recording. All accessors return slices of the
+    # memory-mapped files, so nothing is loaded until it is used.
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.n_objects = meta['n_objects']
+        time_path, state_path = os.path.join(path, 'time.f64'), os.path.join(path, 'state.f64')
+        # Only whole flushed steps count; mmap also refuses empty files.
+        steps = os.path.getsize(time_path) // 8
+        if steps == 0:
+            self.time = np.empty(0)
+            self.state = np.empty((0, self.n_objects, len(FIELDS)))
+            return
+        self.time = np.memmap(time_path, dtype=np.float64, mode='r', shape=(steps,))
+        self.state = np.memmap(state_path, dtype=np.float64, mode='r',
+                               shape=(steps, self.n_objects, len(FIELDS)))
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def positions(self):
+        return self.state[:, :, :2]
+
+    @property
+    def velocities(self):
+        return self.state[:, :, 2:]
+
+    def object(self, index):
+        return self.state[:, index]
+
+    def window(self, start_time, end_time):
+        start, end = np.searchsorted(self.time, [start_time, end_time])
+        return self.time[start:end], self.state[start:end]
@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+import numpy as np
+
+# Runs a newton_opt.Simulation on a worker thread so slow steps do not stall
+# the GUI and slow frames do not stall the physics. The thread publishes
+# Frames, copies of what the visualizer draws, through a triple buffer: the
+# reader always gets the newest complete frame and neither side waits for the
+# other beyond swapping two indices. Changes to the simulation are submitted
+# as commands, callables taking the simulation, and run between steps.
+#
+#   runner = SimulationThread(sim).start()
+#   runner.submit(lambda sim: setattr(sim, 'gravity', 5.0))
+#   vis.draw(runner.frame())
+#   runner.stop()
+
+class Frame:
+    # Read-only stand-in for the simulation, with the attributes and methods
+    # the visualizer uses when drawing and picking.
+    def __init__(self):
+        self.time = 0.0
+        self.gravity = 0.0
+        self.air_resistance = 0.0
+        self.paused = False
+        self.version = None
+        self.objects = []
+        self.obstacles = []
+        self.trail_length = 0
+        self.positions = np.empty((0, 2))
+        self.velocities = np.empty((0, 2))
+        self.masses = np.empty(0)
+        self.elasticities = np.empty(0)
+        self._rows = None
+        self.trail_counts = np.empty(0, dtype=np.intp)
+        self._trails = np.empty((0, 0, 2))
+
+    def capture(self, sim):
+        self.time, self.gravity, self.air_resistance = sim.time, sim.gravity, sim.air_resistance
+        self.paused = sim.paused
+        if self.version != sim.version:
+            self.objects = list(sim.objects)
+            self.version = sim.version
+            self._rows = None
+        self.obstacles = list(sim.obstacles)
+        self.trail_length = sim.trail_length
+        # Arrays are copied into the frame's own buffers, reallocated only
+        # when the object count or trail length changes.
+        self.positions = self._copy(self.positions, sim.render_positions())
+        self.velocities = self._copy(self.velocities, sim.velocities)
+        self.masses = self._copy(self.masses, sim.masses)
+        self.elasticities = self._copy(self.elasticities, sim.elasticities)
+        self.trail_counts = self._copy(self.trail_counts, sim.trail_counts)
+        self._trails = self._copy(self._trails, sim.trail_history())
+
+    @staticmethod
+    def _copy(buffer, values):
+        if buffer.shape != values.shape:
+            return values.copy()
+        np.copyto(buffer, values)
+        return buffer
+
+    def render_positions(self):
+        return self.positions
+
+    def row_of(self, obj):
+        # Row of obj in this frame's arrays, or None if it was not in the
+        # simulation when the frame was taken. obj.index is not used, as the
+        # simulation thread may be moving obj meanwhile.
+        if self._rows is None:
+            self._rows = {id(o): row for row, o in enumerate(self.objects)}
+        row = self._rows.get(id(obj))
+        return row if row is not None and self.objects[row] is obj else None
+
+    def trail_history(self):
+        return self._trails
+
+class SimulationThread:
+    def __init__(self, sim):
+        self.sim = sim
+        self.commands = queue.Queue()
+        self.error = None
+        # The writer fills frames[back]; frames[latest] is the newest complete
+        # frame and frames[front] the one being drawn.
+        self._frames = [Frame(), Frame(), Frame()]
+        self._back, self._latest, self._front = 0, 1, 2
+        self._frames[self._latest].capture(sim)
+        self._fresh = True
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='simulation', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+
+    def submit(self, command):
+        self.commands.put(command)
+
+    def frame(self):
+        if self.error is not None:
+            raise RuntimeError("Simulation thread failed") from self.error
+        with self._lock:
+            if self._fresh:
+                self._front, self._latest = self._latest, self._front
+                self._fresh = False
+        return self._frames[self._front]
+
+    def _apply_commands(self):
+        while True:
+            try:
+                command = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            command(self.sim)
+
+    def _publish(self):
+        self._frames[self._back].capture(self.sim)
+        with self._lock:
+            self._back, self._latest = self._latest, self._back
+            self._fresh = True
+
+    def _run(self):
+        sim = self.sim
+        last = time.perf_counter()
+        try:
+            while not self._stopping.is_set():
+                self._apply_commands()
+                now = time.perf_counter()
+                sim.advance(now - last)
+                last = now
+                # Frames are only captured once the last one has been taken,
+                # so copying keeps pace with drawing rather than stepping.
+                if not self._fresh:
+                    self._publish()
+                wait = sim.fixed_dt if sim.paused else sim.fixed_dt - sim.accumulator
+                self._stopping.wait(max(wait, 0.0))
+        except Exception as e:
+            self.error = e
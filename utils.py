@@ -1,26 +1,73 @@
 from typing import Union
-import cmath as c
+import math
+import numpy as np
 from vectors.Vector2D import Vector2D
 from vectors.Vector1D import Vector1D
 from vectors.Vector3D import Vector3D
+from vectors.VectorArray import VectorArray
 
-def angle_between(vector1: Union[Vector2D, Vector1D, Vector3D], vector2: Union[Vector2D, Vector1D, Vector3D]):
-    return c.acos(vector1.dotproduct(vector2) / (vector1.magnitude * vector2.magnitude)) * (180 / c.pi)
+# Every helper takes single vectors or stacked ones: Vector2DArray /
+# Vector3DArray, or arrays of shape (..., 2) or (..., 3). Stacked inputs
+# broadcast against each other and give an array with one result per vector;
+# single vectors give a float. As before, angle_between returns degrees and
+# the component helpers take radians; degrees= switches either unit. Results
+# are always real.
 
-def work (force: Union[Vector2D, Vector1D, Vector3D], distance: Union[Vector2D, Vector1D, Vector3D]):
-    return force.dotproduct(distance)
+Vectors = Union[Vector1D, Vector2D, Vector3D, VectorArray, np.ndarray]
 
-def area (vector1, vector2):
-    return vector1.magnitude * vector2.magnitude * c.sin(angle_between(vector1, vector2))
+def _as_array(vector):
+    if isinstance(vector, VectorArray):
+        return vector.array
+    if isinstance(vector, Vector1D):
+        return np.array(vector._components(), dtype=np.float64)
+    return np.asarray(vector, dtype=np.float64)
 
-def torque(vector1: Union[Vector2D, Vector3D], vector2: Union[Vector2D, Vector3D]):
-    return vector1.crossproduct(vector2).magnitude
+def _result(values):
+    return values.item() if np.ndim(values) == 0 else values
 
-def xcomponent2D(res, theta):
-    return res * c.cos(theta)
+def _pair(vector1, vector2):
+    a, b = _as_array(vector1), _as_array(vector2)
+    if a.shape[-1:] != b.shape[-1:]:
+        raise ValueError(f"Vectors have different dimensions: {a.shape[-1:]} and {b.shape[-1:]}")
+    return a, b
 
-def ycomponent2D(res, theta):
-    return res * c.sin(theta)
+def _dot(a, b):
+    return np.sum(a * b, axis=-1)
+
+def _cross_magnitude(a, b):
+    if a.shape[-1] == 1:
+        return np.zeros(np.broadcast_shapes(a.shape, b.shape)[:-1])
+    if a.shape[-1] == 2:
+        return np.abs(a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0])
+    return np.linalg.norm(np.cross(a, b), axis=-1)
+
+def angle_between(vector1: Vectors, vector2: Vectors, degrees=True):
+    a, b = _pair(vector1, vector2)
+    cosine = _dot(a, b) / (np.linalg.norm(a, axis=-1) * np.linalg.norm(b, axis=-1))
+    # Rounding can push parallel vectors just past +-1.
+    angle = np.arccos(np.clip(cosine, -1.0, 1.0))
+    return _result(np.degrees(angle) if degrees else angle)
+
+def work(force: Vectors, distance: Vectors):
+    return _result(_dot(*_pair(force, distance)))
+
+def area(vector1: Vectors, vector2: Vectors):
+    # Area of the parallelogram spanned by the two vectors.
+    return _result(_cross_magnitude(*_pair(vector1, vector2)))
+
+def torque(vector1: Vectors, vector2: Vectors):
+    # Magnitude of the torque of force vector2 applied at lever arm vector1.
+    return _result(_cross_magnitude(*_pair(vector1, vector2)))
+
+def xcomponent2D(res, theta, degrees=False):
+    theta = np.radians(theta) if degrees else theta
+    return _result(np.multiply(res, np.cos(theta)))
+
+def ycomponent2D(res, theta, degrees=False):
+    theta = np.radians(theta) if degrees else theta
+    return _result(np.multiply(res, np.sin(theta)))
 
 def resultant2D(x, y):
-    return c.sqrt(x**2 + y**2)
+    if np.ndim(x) == 0 and np.ndim(y) == 0:
+        return math.hypot(x, y)
+    return np.hypot(x, y)
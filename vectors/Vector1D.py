@@ -1,21 +1,52 @@
 import cmath
-import numpy as np
+import math
 
-from vectors import Vector3D
 
 class Vector1D:
-    def __init__(self, x, dims):
-        self.dims = dims
+    # Vectors are values: components are set once, and magnitude and
+    # direction are computed on first use and cached. Real components go
+    # through math; complex components give cmath's complex magnitude.
+    __slots__ = ('x', '_magnitude', '_direction')
+    dims = 1
+
+    def __init__(self, x):
         self.x: float = x
-        self.magnitude: float = cmath.sqrt(x**2)
-        self.direction: float = cmath.atan2(0)
-        
-    
-    def __dotproduct__(self, other) -> float:
+
+    @staticmethod
+    def _norm(*components):
+        if any(isinstance(c, complex) for c in components):
+            return cmath.sqrt(sum(c * c for c in components))
+        return math.hypot(*components)
+
+    @property
+    def magnitude(self):
+        try:
+            return self._magnitude
+        except AttributeError:
+            self._magnitude = self._norm(*self._components())
+            return self._magnitude
+
+    @property
+    def direction(self):
+        try:
+            return self._direction
+        except AttributeError:
+            self._direction = self._angle()
+            return self._direction
+
+    def _components(self):
+        return (self.x,)
+
+    def _angle(self):
+        return math.atan2(0, self.x)
+
+    def dotproduct(self, other) -> float:
         if type(other) is Vector1D:
             return self.x * other.x;
         else:
             return None
+
+    __dotproduct__ = dotproduct
         
     def __add__(self, other):
         return Vector1D(self.x + other.x)
@@ -37,8 +68,10 @@ class Vector1D:
         return Vector1D(self.x**scalar)
     
     def project(self, other):
+        # Component of this vector along other.
         dot = self.dotproduct(other) / other.magnitude**2
-        return self * dot
+        return other * dot
     
     def extend(self):
+        from vectors.Vector3D import Vector3D
         return Vector3D(self.x, 0, 0)
\ No newline at end of file
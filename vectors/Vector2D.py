@@ -1,14 +1,20 @@
-from Vector1D import Vector1D
-from Vector3D import Vector3D
-import numpy as np
-import cmath
+from vectors.Vector1D import Vector1D
+from vectors.Vector3D import Vector3D
+import math
 
 class Vector2D(Vector1D):
+    __slots__ = ('y',)
+    dims = 2
+
     def __init__(self, x, y):
-        super().__init__(x, 2)
+        self.x = x
         self.y = y
-        self.magnitude = cmath.sqrt(x**2 + y**2)
-        self.direction = cmath.atan2(y, x)
+
+    def _components(self):
+        return (self.x, self.y)
+
+    def _angle(self):
+        return math.atan2(self.y, self.x)
     
     def dotproduct(self, other) -> float:
         if type(other) is Vector2D:
@@ -32,16 +38,12 @@ class Vector2D(Vector1D):
     def __str__(self):
         return f"<{self.x}, {self.y}>"
     
-    def project(self, other):
-        dot = self.dotproduct(other) / other.magnitude**2
-        return self * dot
-    
     def __pow__(self, scalar):
         return Vector2D(self.x**scalar, self.y**scalar)
     
     def project(self, other):
         dot = self.dotproduct(other) / other.magnitude**2
-        return self * dot
+        return other * dot
     
     def extend(self):
         return Vector3D(self.x, self.y, 0)
\ No newline at end of file
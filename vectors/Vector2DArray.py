@@ -0,0 +1,22 @@
+import numpy as np
+from vectors.Vector2D import Vector2D
+from vectors.VectorArray import VectorArray
+
+
+class Vector2DArray(VectorArray):
+    dims = 2
+    scalar = Vector2D
+
+    @classmethod
+    def from_components(cls, x, y):
+        components = np.broadcast_arrays(*(np.asarray(c, dtype=np.float64) for c in (x, y)))
+        return cls(np.stack(components, axis=-1))
+
+    def crossproduct(self, other):
+        # z component of the cross product of the vectors taken in the plane.
+        other = np.broadcast_to(self._coerce(other), self.array.shape)
+        return self.array[:, 0] * other[:, 1] - self.array[:, 1] * other[:, 0]
+
+    def extend(self):
+        from vectors.Vector3DArray import Vector3DArray
+        return Vector3DArray(np.column_stack([self.array, np.zeros(len(self.array))]))
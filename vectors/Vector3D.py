@@ -1,16 +1,23 @@
-from Vector1D import Vector1D
-import cmath
+from vectors.Vector1D import Vector1D
+import math
 
 class Vector3D(Vector1D):
+    __slots__ = ('y', 'z')
+    dims = 3
+
     def __init__(self, x, y, z):
-        super().__init__(x, 3)
+        self.x = x
         self.y = y
         self.z = z
-        self.magnitude = cmath.sqrt(x**2 + y**2 + z**2)
-        self.direction = cmath.atan2(y, x)
+
+    def _components(self):
+        return (self.x, self.y, self.z)
+
+    def _angle(self):
+        return math.atan2(self.y, self.x)
         
     def dotproduct(self, other) -> float:
-        if type(other) is Vector1D:
+        if type(other) is Vector3D:
             return self.x * other.x + self.y * other.y + self.z * other.z;
         else:
             return None
@@ -49,4 +56,7 @@ class Vector3D(Vector1D):
     
     def project(self, other):
         dot = self.dotproduct(other) / other.magnitude**2
-        return self * dot
\ No newline at end of file
+        return other * dot
+
+    def extend(self):
+        return Vector3D(self.x, self.y, self.z)
\ No newline at end of file
@@ -0,0 +1,24 @@
+import numpy as np
+from vectors.Vector3D import Vector3D
+from vectors.VectorArray import VectorArray
+
+
+class Vector3DArray(VectorArray):
+    dims = 3
+    scalar = Vector3D
+
+    @classmethod
+    def from_components(cls, x, y, z):
+        components = np.broadcast_arrays(*(np.asarray(c, dtype=np.float64) for c in (x, y, z)))
+        return cls(np.stack(components, axis=-1))
+
+    @property
+    def z(self):
+        return self.array[:, 2]
+
+    def crossproduct(self, other):
+        other = np.broadcast_to(self._coerce(other), self.array.shape)
+        return Vector3DArray(np.cross(self.array, other))
+
+    def extend(self):
+        return Vector3DArray(self.array.copy())
@@ -0,0 +1,118 @@
+import numpy as np
+
+
+class VectorArray:
+    # N vectors of one dimension held in a single (N, dims) float64 array,
+    # with the operations of the scalar vector classes done for every row at
+    # once. Operands can be another array of the same type, one scalar vector
+    # (applied to every row) or anything numpy broadcasts against the data.
+    dims = None
+    scalar = None
+
+    def __init__(self, data):
+        # A float64 array is used as is, without copying. Data must have
+        # dims as its last axis; leading axes are flattened into rows. A flat
+        # 1-D array is read as consecutive vectors.
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim == 1 and len(data) % self.dims == 0:
+            data = data.reshape(-1, self.dims)
+        if data.ndim < 2 or data.shape[-1] != self.dims:
+            raise ValueError(f"{type(self).__name__} needs data of shape (..., {self.dims}), got {data.shape}")
+        self.array = data.reshape(-1, self.dims)
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        return cls(np.array([cls._components(v) for v in vectors], dtype=np.float64).reshape(-1, cls.dims))
+
+    def to_vectors(self):
+        return [self.scalar(*row) for row in self.array.tolist()]
+
+    @classmethod
+    def _components(cls, vector):
+        return [vector.x, vector.y, getattr(vector, 'z', 0)][:cls.dims]
+
+    def _coerce(self, other):
+        if isinstance(other, VectorArray):
+            return other.array
+        if hasattr(other, 'dims') and hasattr(other, 'x'):
+            return np.array(self._components(other), dtype=np.float64)
+        return np.asarray(other, dtype=np.float64)
+
+    @staticmethod
+    def _per_row(scalar):
+        # Scalars apply to every row; an (N,) array gives one per row.
+        scalar = np.asarray(scalar, dtype=np.float64)
+        return scalar[:, None] if scalar.ndim == 1 else scalar
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.scalar(*self.array[index].tolist())
+        return type(self)(self.array[index])
+
+    def __iter__(self):
+        return iter(self.to_vectors())
+
+    def __array__(self, dtype=None, copy=None):
+        if copy is False and dtype is not None and np.dtype(dtype) != self.array.dtype:
+            raise ValueError(f"Cannot convert to {np.dtype(dtype)} without copying")
+        if copy:
+            return self.array.astype(dtype or self.array.dtype, copy=True)
+        return self.array if dtype is None else self.array.astype(dtype, copy=False)
+
+    @property
+    def x(self):
+        return self.array[:, 0]
+
+    @property
+    def y(self):
+        return self.array[:, 1]
+
+    @property
+    def magnitude(self):
+        return np.sqrt(np.einsum('ij,ij->i', self.array, self.array))
+
+    @property
+    def direction(self):
+        return np.arctan2(self.array[:, 1], self.array[:, 0])
+
+    def dotproduct(self, other):
+        other = self._coerce(other)
+        return np.einsum('ij,ij->i', self.array, np.broadcast_to(other, self.array.shape))
+
+    def __add__(self, other):
+        return type(self)(self.array + self._coerce(other))
+
+    def __sub__(self, other):
+        return type(self)(self.array - self._coerce(other))
+
+    def __mul__(self, scalar):
+        return type(self)(self.array * self._per_row(scalar))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar):
+        scalar = self._per_row(scalar)
+        if np.any(scalar == 0):
+            raise ZeroDivisionError("Division by zero")
+        return type(self)(self.array / scalar)
+
+    def __neg__(self):
+        return type(self)(-self.array)
+
+    def __pow__(self, scalar):
+        return type(self)(self.array ** self._per_row(scalar))
+
+    def project(self, other):
+        # Projection of each vector onto the matching vector of other.
+        other = np.broadcast_to(self._coerce(other), self.array.shape)
+        scale = np.einsum('ij,ij->i', self.array, other) / np.einsum('ij,ij->i', other, other)
+        return type(self)(other * scale[:, None])
+
+    def __str__(self):
+        return "\n".join(f"<{', '.join(map(str, row))}>" for row in self.array.tolist())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.array.tolist()!r})"